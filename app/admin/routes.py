@@ -1,23 +1,21 @@
 # app/admin/routes.py
 from fastapi import APIRouter, Request, Depends, Form, HTTPException, status, UploadFile, File
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from app.core.templating import templates
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.products.models import Product, Category
 from app.auth.models import User
-from app.core.security import get_current_user_from_cookie
+from app.dependencies import get_current_user
+from app.products.search import search_index
+from app.products.cache import invalidate_catalog_caches
 from app.utils import save_upload_file 
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 # --- DEPENDENCY: VERIFY ADMIN/SELLER ---
-def get_current_seller(request: Request, db: Session = Depends(get_db)):
-    user_payload = get_current_user_from_cookie(request)
-    if not user_payload:
-        return None
-    user = db.query(User).filter(User.email == user_payload["sub"]).first()
+def get_current_seller(user: User = Depends(get_current_user)):
     # Allow if user is admin or seller
     if user and user.role in ["admin", "seller"]:
         return user
@@ -25,8 +23,7 @@ def get_current_seller(request: Request, db: Session = Depends(get_db)):
 
 # --- ROUTE 1: DASHBOARD ---
 @router.get("/")
-async def admin_dashboard(request: Request, db: Session = Depends(get_db)):
-    user = get_current_seller(request, db)
+def admin_dashboard(request: Request, db: Session = Depends(get_db), user: User = Depends(get_current_seller)):
     if not user:
         return RedirectResponse(url="/auth/login", status_code=302)
 
@@ -41,8 +38,7 @@ async def admin_dashboard(request: Request, db: Session = Depends(get_db)):
 
 # --- ROUTE 2: SHOW ADD PRODUCT FORM ---
 @router.get("/add")
-async def show_add_product_form(request: Request, db: Session = Depends(get_db)):
-    user = get_current_seller(request, db)
+def show_add_product_form(request: Request, db: Session = Depends(get_db), user: User = Depends(get_current_seller)):
     if not user:
         return RedirectResponse(url="/auth/login", status_code=302)
 
@@ -54,6 +50,14 @@ async def show_add_product_form(request: Request, db: Session = Depends(get_db))
         "user": user   # Fixes "Login" button issue
     })
 
+# --- HELPER: INSERT A PRODUCT (sync, called through the threadpool) ---
+def save_new_product(db: Session, product: Product):
+    db.add(product)
+    db.commit()
+    db.refresh(product)
+    search_index.add_product(product)
+    invalidate_catalog_caches()
+
 # --- ROUTE 3: PROCESS THE FORM SUBMISSION ---
 @router.post("/add")
 async def create_product(
@@ -65,9 +69,9 @@ async def create_product(
     category_id: int = Form(...),
     # REMOVED image_url: str = Form(...) 
     image_file: UploadFile = File(...), # We only accept the file now
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_seller),
 ):
-    user = get_current_seller(request, db)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
@@ -84,16 +88,18 @@ async def create_product(
         category_id=category_id,
         seller_id=user.id
     )
-
-    db.add(new_product)
-    db.commit()
+    await run_in_threadpool(save_new_product, db, new_product)
     
     return RedirectResponse(url="/admin", status_code=303)
 
 # --- ROUTE 4: DELETE PRODUCT ---
 @router.post("/delete/{product_id}")
-async def delete_product(product_id: int, request: Request, db: Session = Depends(get_db)):
-    user = get_current_seller(request, db)
+def delete_product(
+    product_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_seller),
+):
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
@@ -101,5 +107,7 @@ async def delete_product(product_id: int, request: Request, db: Session = Depend
     if product:
         db.delete(product)
         db.commit()
+        search_index.remove_product(product_id)
+        invalidate_catalog_caches()
     
     return RedirectResponse(url="/admin", status_code=303)
\ No newline at end of file
@@ -1,14 +1,14 @@
 # app/auth/routes.py
 from fastapi import APIRouter, Depends, status, Request, Form, Response
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from app.core.templating import templates
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.auth import models, schemas
-from app.core.security import get_password_hash, verify_password, create_access_token
+from app.core.security import get_password_hash_async, verify_password_async, create_access_token
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 # --- Render Pages ---
 @router.get("/register", response_class=HTMLResponse)
@@ -19,10 +19,21 @@ async def register_page(request: Request):
 async def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
-# --- API Logic ---
-# app/auth/routes.py
+# --- DB Helpers ---
+# register/login stay async so bcrypt can be awaited in its own pool;
+# their (sync) DB calls go through the threadpool instead of the event loop.
+def get_user_by_email(db: Session, email: str):
+    user = db.query(models.User).filter(models.User.email == email).first()
+    # Hand the connection back to the pool before the slow password hash,
+    # otherwise a login burst holds every pooled connection while it waits
+    db.close()
+    return user
 
-# ... imports ...
+def save_user(db: Session, user: models.User):
+    db.add(user)
+    db.commit()
+
+# --- API Logic ---
 
 @router.post("/register")
 async def register(
@@ -33,15 +44,8 @@ async def register(
     role: str = Form("buyer"),
     db: Session = Depends(get_db)
 ):
-    # --- DEBUGGING START ---
-    print(f"DEBUG REGISTER: Username is: {username}")
-    print(f"DEBUG REGISTER: Email is: {email}")
-    print(f"DEBUG REGISTER: Password length: {len(password)}")
-    print(f"DEBUG REGISTER: Password content: '{password}'") 
-    # --- DEBUGGING END ---
-
     # Check if user exists
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = await run_in_threadpool(get_user_by_email, db, email)
     if user:
         return templates.TemplateResponse("register.html", {"request": request, "error": "Email already registered"})
     
@@ -56,11 +60,10 @@ async def register(
         username=username,
         email=email,
         # The crash happens here if password is huge
-        password_hash=get_password_hash(password), 
+        password_hash=await get_password_hash_async(password), 
         role=role
     )
-    db.add(new_user)
-    db.commit()
+    await run_in_threadpool(save_user, db, new_user)
     
     # Redirect to Login
     return RedirectResponse(url="/auth/login", status_code=status.HTTP_303_SEE_OTHER)
@@ -74,34 +77,25 @@ async def login(
     password: str = Form(...),
     db: Session = Depends(get_db)
 ):
-    print(f"DEBUG: Login attempt for {email}")
-    print(f"DEBUG: Input Password length: {len(password)}")
-    print(f"DEBUG: Input Password content: '{password}'") # View the actual text
-
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = await run_in_threadpool(get_user_by_email, db, email)
     
     if not user:
-        print("DEBUG: User not found")
         return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid credentials"})
 
-    print(f"DEBUG: Stored Hash length: {len(user.password_hash)}")
-    
     # --- SAFETY CHECK ---
     # Bcrypt crashes if the first argument (plain password) is > 72 bytes.
     # We check this before calling verify to prevent the crash.
     if len(password) > 72:
-        print("DEBUG: ERROR! Password input is too long!")
         return templates.TemplateResponse("login.html", {"request": request, "error": "Password too long"})
 
     # IMPORTANT: Ensure arguments are (PLAIN, HASHED)
-    is_valid = verify_password(password, user.password_hash)
+    is_valid = await verify_password_async(password, user.password_hash)
     
     if not is_valid:
-        print("DEBUG: Password mismatch")
         return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid credentials"})
     
     # ... rest of your code (token creation) ...
-    access_token = create_access_token(data={"sub": user.email, "role": user.role.value})
+    access_token = create_access_token(data={"sub": user.email, "uid": user.id, "role": user.role.value})
     response = RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
     response.set_cookie(key="access_token", value=f"Bearer {access_token}", httponly=True)
     return response
@@ -1,5 +1,5 @@
 # app/cart/models.py
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -15,6 +15,8 @@ class Cart(Base):
 
 class CartItem(Base):
     __tablename__ = "cart_items"
+    # One row per product per cart, so adds can be single-statement upserts
+    __table_args__ = (UniqueConstraint("cart_id", "product_id", name="uq_cart_items_cart_product"),)
 
     id = Column(Integer, primary_key=True, index=True)
     cart_id = Column(Integer, ForeignKey("carts.id"))
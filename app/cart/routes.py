@@ -1,62 +1,58 @@
 # app/cart/routes.py
 from fastapi import APIRouter, Depends, status, Request, Form, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session, joinedload
-from app.database import get_db
-from app.cart import models
+from app.core.templating import templates
+from sqlalchemy.orm import Session
+from app.database import get_db, get_read_db, run_db
+from app.cart.store import cart_store, load_cart_lines, merge_cart_ops
+from app.cart.schemas import CartBatch, CartOut, CartLineOut
 from app.products.models import Product
 from app.auth.models import User
-from app.core.security import get_current_user_from_cookie
+from app.dependencies import get_current_user
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
-
-# --- Helper: Get or Create Cart for User ---
-def get_user_cart(db: Session, user_id: int):
-    cart = db.query(models.Cart).filter(models.Cart.user_id == user_id).first()
-    if not cart:
-        cart = models.Cart(user_id=user_id)
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
-    return cart
+
+# --- Helper: Turn a ?error= code from checkout into a message ---
+def cart_error_message(error, product_id, cart_items):
+    if error != "out_of_stock":
+        return None
+    for item in cart_items:
+        if item.product_id == product_id:
+            left = item.product.stock or 0
+            if left <= 0:
+                return f"{item.product.title} just sold out. Remove it to continue."
+            return f"Only {left} left of {item.product.title}. Lower the quantity to continue."
+    return "Some items in your cart are no longer in stock."
 
 # --- 1. View Cart Page ---
 @router.get("/", response_class=HTMLResponse)
-async def view_cart(request: Request, db: Session = Depends(get_db)):
-    user_data = get_current_user_from_cookie(request)
-    if not user_data:
+async def view_cart(request: Request, error: str = None, product_id: int = None,
+                    db: Session = Depends(get_read_db), user: User = Depends(get_current_user)):
+    if not user:
         return RedirectResponse(url="/auth/login", status_code=status.HTTP_303_SEE_OTHER)
 
-    user = db.query(User).filter(User.email == user_data["sub"]).first()
-    cart = get_user_cart(db, user.id)
-    
-    # Eager load items and products to prevent database spam
-    cart_items = db.query(models.CartItem).options(joinedload(models.CartItem.product))\
-        .filter(models.CartItem.cart_id == cart.id).all()
+    cart_items = await run_db(db, load_cart_lines, user.id)
 
     # Calculate Total
     total_price = sum(item.product.price * item.quantity for item in cart_items)
+    error_message = cart_error_message(error, product_id, cart_items)
 
     return templates.TemplateResponse("cart.html", {
         "request": request, 
         "cart_items": cart_items, 
         "total_price": total_price,
+        "error_message": error_message,
         "user":user
     })
 
 # --- 2. Add Item to Cart ---
 @router.post("/add/{product_id}")
-async def add_to_cart(product_id: int, request: Request, db: Session = Depends(get_db)):
-    user_data = get_current_user_from_cookie(request)
-    if not user_data:
+def add_to_cart(product_id: int, request: Request, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    if not user:
         return RedirectResponse(url="/auth/login", status_code=status.HTTP_303_SEE_OTHER)
     
-    user = db.query(User).filter(User.email == user_data["sub"]).first()
-    
     # Fetch the product to check who owns it
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
@@ -64,33 +60,41 @@ async def add_to_cart(product_id: int, request: Request, db: Session = Depends(g
     if product.seller_id == user.id:
         # Optionally: Redirect back with an error message
         # For now, we just stop the action
-        print("DEBUG: Seller tried to buy own product")
         return RedirectResponse(url=f"/products/{product_id}", status_code=status.HTTP_303_SEE_OTHER)
 
-    # ... rest of cart logic (get_user_cart, add item) ...
-    cart = get_user_cart(db, user.id)
+    cart_store.add(db, user.id, product_id)
+    return RedirectResponse(url="/cart", status_code=status.HTTP_303_SEE_OTHER)
 
-    existing_item = db.query(models.CartItem).filter(
-        models.CartItem.cart_id == cart.id,
-        models.CartItem.product_id == product_id
-    ).first()
+# --- 3. Remove Item from Cart ---
+@router.get("/remove/{product_id}")
+def remove_item(product_id: int, request: Request, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    if not user:
+        return RedirectResponse(url="/auth/login", status_code=status.HTTP_303_SEE_OTHER)
 
-    if existing_item:
-        existing_item.quantity += 1
-    else:
-        new_item = models.CartItem(cart_id=cart.id, product_id=product_id, quantity=1)
-        db.add(new_item)
-    
-    db.commit()
-    return RedirectResponse(url="/cart", status_code=status.HTTP_303_SEE_OTHER)
+    cart_store.remove(db, user.id, product_id)
 
-# app/cart/routes.py
-@router.get("/remove/{item_id}")
-async def remove_item(item_id: int, request: Request, db: Session = Depends(get_db)):
-    item = db.query(models.CartItem).filter(models.CartItem.id == item_id).first()
-    if item:
-        db.delete(item)
-        db.commit()
-    
     # This redirects back to the main cart page
-    return RedirectResponse(url="/cart", status_code=status.HTTP_303_SEE_OTHER)
\ No newline at end of file
+    return RedirectResponse(url="/cart", status_code=status.HTTP_303_SEE_OTHER)
+
+# --- 4. Batch Update (JSON: many add/remove/set operations, one round trip) ---
+@router.post("/batch", response_model=CartOut)
+def batch_update(batch: CartBatch, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    if not user:
+        raise HTTPException(status_code=401, detail="Not logged in")
+
+    changes = merge_cart_ops((op.op, op.product_id, op.quantity) for op in batch.ops)
+
+    # Validate every product that ends up in the cart with one query
+    wanted = [product_id for product_id, (_, quantity) in changes.items() if quantity > 0]
+    sellers = dict(db.query(Product.id, Product.seller_id).filter(Product.id.in_(wanted)).all()) if wanted else {}
+    missing = sorted(set(wanted) - set(sellers))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Products not found: {missing}")
+    if any(seller_id == user.id for seller_id in sellers.values()):
+        raise HTTPException(status_code=400, detail="You cannot buy your own products")
+
+    cart_store.apply(db, user.id, changes)
+
+    items = cart_store.get_items(db, user.id)
+    return CartOut(items=[CartLineOut(product_id=product_id, quantity=quantity)
+                          for product_id, quantity in items.items()])
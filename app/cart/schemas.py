@@ -0,0 +1,19 @@
+# app/cart/schemas.py
+from pydantic import BaseModel, Field
+from typing import List, Literal
+
+class CartOp(BaseModel):
+    op: Literal["add", "remove", "set"]
+    product_id: int
+    quantity: int = Field(1, ge=0)
+
+class CartBatch(BaseModel):
+    # Applied in order, all or nothing
+    ops: List[CartOp] = Field(..., min_length=1, max_length=200)
+
+class CartLineOut(BaseModel):
+    product_id: int
+    quantity: int
+
+class CartOut(BaseModel):
+    items: List[CartLineOut]
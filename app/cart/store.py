@@ -0,0 +1,306 @@
+# app/cart/store.py
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session, joinedload
+from app.cart import models
+from app.core.config import settings
+from app.core.utils import upsert
+from app.database import SessionLocal
+from app.products.models import Product
+
+logger = logging.getLogger(__name__)
+
+
+class CartLine(NamedTuple):
+    """One row of a cart as the templates see it."""
+    product: Product
+    quantity: int
+
+    @property
+    def product_id(self) -> int:
+        return self.product.id
+
+
+# A cart change for one product: ("add", n) adds n, ("set", n) sets the quantity (0 removes it)
+Change = Tuple[str, int]
+
+def merge_cart_ops(ops: Iterable[Tuple[str, int, int]]) -> Dict[int, Change]:
+    """Collapses (op, product_id, quantity) operations, applied in order, into one change per product."""
+    changes: Dict[int, Change] = {}
+    for op, product_id, quantity in ops:
+        kind, current = changes.get(product_id, ("add", 0))
+        if op == "add":
+            changes[product_id] = (kind, current + quantity)
+        elif op == "remove":
+            changes[product_id] = ("set", 0)
+        elif op == "set":
+            changes[product_id] = ("set", quantity)
+        else:
+            raise ValueError(f"Unknown cart operation: {op!r}")
+    return changes
+
+def _read_cart(db: Session, user_id: int) -> Dict[int, int]:
+    """{product_id: quantity} straight from cart_items, oldest first."""
+    rows = db.query(models.CartItem.product_id, models.CartItem.quantity)\
+        .join(models.Cart).filter(models.Cart.user_id == user_id)\
+        .order_by(models.CartItem.id).all()
+    items: Dict[int, int] = {}
+    for product_id, quantity in rows:
+        items[product_id] = items.get(product_id, 0) + (quantity or 0)
+    return items
+
+def load_cart_lines(db: Session, user_id: int) -> List[CartLine]:
+    """The user's cart with products (and categories) in one extra query."""
+    items = cart_store.get_items(db, user_id)
+    if not items:
+        return []
+    products = db.query(Product).options(joinedload(Product.category))\
+        .filter(Product.id.in_(list(items))).all()
+    by_id = {product.id: product for product in products}
+    # Products deleted since they were added just drop out of the cart
+    return [CartLine(by_id[product_id], quantity)
+            for product_id, quantity in items.items() if product_id in by_id]
+
+
+class DatabaseCartStore:
+    """
+    Every change is its own transaction on carts/cart_items.
+    Safe with any number of workers; this is the default.
+    """
+
+    def get_items(self, db: Session, user_id: int) -> Dict[int, int]:
+        return _read_cart(db, user_id)
+
+    def add(self, db: Session, user_id: int, product_id: int, quantity: int = 1):
+        self.apply(db, user_id, {product_id: ("add", quantity)})
+
+    def remove(self, db: Session, user_id: int, product_id: int):
+        self.apply(db, user_id, {product_id: ("set", 0)})
+
+    def apply(self, db: Session, user_id: int, changes: Dict[int, Change]):
+        """At most one DELETE and two upserts, in one transaction."""
+        cart_id = self._cart_id(db, user_id)
+        removed = [product_id for product_id, (kind, quantity) in changes.items() if kind == "set" and quantity <= 0]
+        added, replaced = [], []
+        for product_id, (kind, quantity) in changes.items():
+            if quantity > 0:
+                row = {"cart_id": cart_id, "product_id": product_id, "quantity": quantity}
+                (added if kind == "add" else replaced).append(row)
+
+        if removed:
+            db.execute(delete(models.CartItem).where(
+                models.CartItem.cart_id == cart_id,
+                models.CartItem.product_id.in_(removed),
+            ))
+        upsert(db, models.CartItem, added, keys=("cart_id", "product_id"), increment=("quantity",))
+        upsert(db, models.CartItem, replaced, keys=("cart_id", "product_id"), replace=("quantity",))
+        db.commit()
+
+    def _cart_id(self, db: Session, user_id: int) -> int:
+        cart_id = db.query(models.Cart.id).filter(models.Cart.user_id == user_id).scalar()
+        if cart_id is None:
+            # Two first clicks racing both land on the same row
+            upsert(db, models.Cart, [{"user_id": user_id}], keys=("user_id",))
+            cart_id = db.query(models.Cart.id).filter(models.Cart.user_id == user_id).scalar()
+        return cart_id
+
+    def flush_user(self, user_id: int):
+        """Nothing is ever pending."""
+
+    def clear(self, user_id: int, ordered: Dict[int, int]):
+        """Checkout already deleted the rows."""
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class MemoryCartStore:
+    """
+    Write-behind store: carts live in this worker's memory and a background
+    thread writes the changed ones to carts/cart_items every few seconds, in
+    one transaction per flush. Clicks never open a write transaction.
+
+    Each worker has its own copy, so only use this with a single worker (or
+    sticky sessions). Checkout calls flush_user() first, so orders are always
+    placed from what the buyer saw.
+    """
+
+    def __init__(self, flush_interval: float, max_carts: int):
+        self.flush_interval = flush_interval
+        self.max_carts = max_carts
+        self._carts: "OrderedDict[int, Dict[int, int]]" = OrderedDict()
+        self._dirty = set()
+        self._lock = threading.Lock()        # guards _carts/_dirty (held briefly)
+        self._flush_lock = threading.Lock()  # one writer to cart_items at a time
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Reads / writes (memory only) ---
+    def get_items(self, db: Session, user_id: int) -> Dict[int, int]:
+        with self._lock:
+            items = self._carts.get(user_id)
+            if items is not None:
+                self._carts.move_to_end(user_id)
+                return dict(items)
+
+        # First touch in this worker: load from the DB, unless a write got in meanwhile
+        loaded = _read_cart(db, user_id)
+        with self._lock:
+            items = self._carts.setdefault(user_id, loaded)
+            self._evict_clean()
+            return dict(items)
+
+    def add(self, db: Session, user_id: int, product_id: int, quantity: int = 1):
+        self.apply(db, user_id, {product_id: ("add", quantity)})
+
+    def remove(self, db: Session, user_id: int, product_id: int):
+        self.apply(db, user_id, {product_id: ("set", 0)})
+
+    def apply(self, db: Session, user_id: int, changes: Dict[int, Change]):
+        def change(items):
+            changed = False
+            for product_id, (kind, quantity) in changes.items():
+                if kind == "add":
+                    if quantity > 0:
+                        items[product_id] = items.get(product_id, 0) + quantity
+                        changed = True
+                elif quantity > 0:
+                    changed |= items.get(product_id) != quantity
+                    items[product_id] = quantity
+                else:
+                    changed |= items.pop(product_id, None) is not None
+            return changed
+        self._update(db, user_id, change)
+
+    def _update(self, db: Session, user_id: int, change):
+        # `change` mutates the cart dict and says whether anything changed
+        while True:
+            with self._lock:
+                items = self._carts.get(user_id)
+                if items is not None:
+                    self._carts.move_to_end(user_id)
+                    if change(items):
+                        self._dirty.add(user_id)
+                    return
+            loaded = _read_cart(db, user_id)
+            with self._lock:
+                self._carts.setdefault(user_id, loaded)
+
+    def clear(self, user_id: int, ordered: Dict[int, int]):
+        """
+        Takes the ordered quantities ({product_id: quantity}) out of the cached
+        cart after checkout removed their rows. Anything added since the
+        checkout's flush_user() stays, and is written back on the next flush.
+        """
+        # Taking the flush lock means no flush still holding the old items can land after us
+        with self._flush_lock, self._lock:
+            items = self._carts.get(user_id)
+            if items is None:
+                return
+            for product_id, quantity in ordered.items():
+                left = items.get(product_id, 0) - quantity
+                if left > 0:
+                    items[product_id] = left
+                else:
+                    items.pop(product_id, None)
+            # A background flush between the order and now may have written the ordered rows back
+            self._dirty.add(user_id)
+
+    def _evict_clean(self):
+        # Only carts with nothing pending can be dropped; they reload on next touch
+        if len(self._carts) <= self.max_carts:
+            return
+        for user_id in list(self._carts):
+            if len(self._carts) <= self.max_carts:
+                break
+            if user_id not in self._dirty:
+                del self._carts[user_id]
+
+    # --- Write-behind ---
+    def flush(self, user_ids=None):
+        """Writes pending carts (all of them, or just `user_ids`) to the DB."""
+        with self._flush_lock:
+            with self._lock:
+                pending = set(self._dirty) if user_ids is None else self._dirty & set(user_ids)
+                snapshot = {user_id: dict(self._carts.get(user_id, {})) for user_id in pending}
+                self._dirty -= pending
+            if not snapshot:
+                return
+
+            db = SessionLocal()
+            try:
+                self._write(db, snapshot)
+            except Exception:
+                db.rollback()
+                # Put them back so the next flush retries
+                with self._lock:
+                    self._dirty |= set(snapshot)
+                raise
+            finally:
+                db.close()
+
+    def flush_user(self, user_id: int):
+        self.flush([user_id])
+
+    def _write(self, db: Session, snapshot: Dict[int, Dict[int, int]]):
+        cart_ids = dict(db.query(models.Cart.user_id, models.Cart.id)
+                        .filter(models.Cart.user_id.in_(list(snapshot))).all())
+        new_carts = [models.Cart(user_id=user_id) for user_id in snapshot if user_id not in cart_ids]
+        if new_carts:
+            db.add_all(new_carts)
+            db.flush()
+            cart_ids.update((cart.user_id, cart.id) for cart in new_carts)
+
+        # Skip products deleted while they sat in a cart
+        product_ids = {product_id for items in snapshot.values() for product_id in items}
+        existing = {row[0] for row in db.query(Product.id).filter(Product.id.in_(list(product_ids)))} \
+            if product_ids else set()
+
+        # Replace each flushed cart's rows wholesale
+        db.execute(delete(models.CartItem).where(models.CartItem.cart_id.in_(list(cart_ids.values()))))
+        rows = [
+            {"cart_id": cart_ids[user_id], "product_id": product_id, "quantity": quantity}
+            for user_id, items in snapshot.items()
+            for product_id, quantity in items.items() if product_id in existing
+        ]
+        if rows:
+            db.execute(insert(models.CartItem), rows)
+        db.commit()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Cart flush failed, will retry")
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cart-flush", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Stops the flush thread and writes whatever is still pending."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+def build_cart_store(backend: str):
+    if backend == "database":
+        return DatabaseCartStore()
+    if backend == "memory":
+        return MemoryCartStore(settings.CART_FLUSH_INTERVAL_SECONDS, settings.CART_STORE_MAX_CARTS)
+    raise ValueError(f"Unknown CART_STORE_BACKEND: {backend!r}")
+
+# One store per worker process
+cart_store = build_cart_store(settings.CART_STORE_BACKEND)
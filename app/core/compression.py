@@ -0,0 +1,161 @@
+# app/core/compression.py
+import gzip
+import zlib
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "text/html", "text/css", "text/plain", "text/javascript", "text/xml",
+    "application/javascript", "application/json", "application/xml", "image/svg+xml",
+}
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """"br" or "gzip" if the client takes it (brotli only when installed), else ""."""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip()] = q
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if offered.get(encoding, offered.get("*", 0.0)) > 0:
+            return encoding
+    return ""
+
+
+class _Compressor:
+    """Incremental br/gzip encoder with one interface."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            # wbits 16+ = gzip container
+            self._obj = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def finish(self) -> bytes:
+        return self._obj.finish() if self.encoding == "br" else self._obj.flush()
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _should_compress(start, minimum_size: int) -> bool:
+    if start["status"] in (204, 206, 304) or start["status"] < 200:
+        return False
+    headers = {k.lower(): v for k, v in start["headers"]}
+    if b"content-encoding" in headers:
+        # Already encoded (precompressed static files)
+        return False
+    if b"no-transform" in headers.get(b"cache-control", b""):
+        return False
+    media_type = headers.get(b"content-type", b"").split(b";")[0].strip().decode("latin-1").lower()
+    if media_type not in COMPRESSIBLE_TYPES:
+        return False
+    length = headers.get(b"content-length")
+    return length is None or int(length) >= minimum_size
+
+
+def _encoded_headers(headers, encoding: str, length=None):
+    out, vary = [], None
+    for k, v in headers:
+        name = k.lower()
+        if name == b"content-length":
+            continue
+        if name == b"vary":
+            vary = v
+            continue
+        if name == b"etag" and not v.startswith(b"W/"):
+            # Same content, different bytes: a weak ETag still matches If-None-Match
+            v = b"W/" + v
+        out.append((k, v))
+    out.append((b"content-encoding", encoding.encode()))
+    out.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+    if length is not None:
+        out.append((b"content-length", str(length).encode()))
+    return out
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware: brotli (when installed) or gzip for text responses.
+
+    Skips responses under `minimum_size`, non-text content types, responses
+    that already carry a Content-Encoding, partial content and HEAD requests.
+    Single-message bodies are compressed in one go; streamed bodies are
+    compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        has_range = any(k == b"range" for k, _ in scope["headers"])
+        encoding = choose_encoding(accept) if not has_range else ""
+        if not encoding:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def wrapped_send(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk says whether more follow
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                first, start = start, None
+                if not _should_compress(first, self.minimum_size) or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(first)
+                elif not more_body:
+                    body = compress(body, encoding)
+                    await send({**first, "headers": _encoded_headers(first["headers"], encoding, len(body))})
+                    return await send({"type": "http.response.body", "body": body})
+                else:
+                    compressor = _Compressor(encoding)
+                    await send({**first, "headers": _encoded_headers(first["headers"], encoding)})
+
+            if passthrough:
+                return await send(message)
+            data = compressor.compress(body)
+            if not more_body:
+                data += compressor.finish()
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, wrapped_send)
+        if start is not None:
+            # A response with a start but no body message at all
+            await send(start)
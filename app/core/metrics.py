@@ -0,0 +1,369 @@
+# app/core/metrics.py
+"""
+Prometheus metrics for /metrics.
+
+Each worker process counts its own requests in memory (MetricsMiddleware,
+a few dict updates per request on the event loop) and writes a JSON
+snapshot to METRICS_DIR/<pid>.json every METRICS_WRITE_INTERVAL_SECONDS.
+Whichever worker answers /metrics adds up every live worker's snapshot,
+so counters cover all of `uvicorn --workers N`, not just one.
+
+When a worker exits (or dies), its counters and histograms are folded into
+METRICS_DIR/archive.json so the totals never go down, which Prometheus
+would read as a counter reset. Its gauges and in-flight count are dropped.
+"""
+import bisect
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+from app.core.config import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "animerch"
+ARCHIVE = "archive.json"
+
+logger = logging.getLogger(__name__)
+
+
+def default_metrics_dir() -> str:
+    # Workers of one uvicorn server share a parent, so they share a directory
+    return settings.METRICS_DIR or os.path.join(tempfile.gettempdir(), f"animerch-metrics-{os.getppid()}")
+
+
+def route_label(scope, status: int) -> str:
+    """Route template, never the raw path, so labels stay few."""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", "<unknown>")
+    if scope.get("endpoint") is not None and scope.get("root_path"):
+        return scope["root_path"]  # mounted app, e.g. /static
+    if status == 404:
+        return "<unmatched>"
+    return scope["path"]  # answered by middleware (page cache) before routing
+
+
+class Metrics:
+    """This worker's counters, plus the gauges and caches read when a snapshot is taken."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.latency: Dict[Tuple[str, str], List[float]] = {}  # per-bucket counts + [+Inf, sum]
+        self.in_flight = 0
+        self.gauges: Dict[str, Callable[[], dict]] = {}
+        self.caches = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self.directory = None
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        with self._lock:
+            key = (method, route, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            series = self.latency.get((method, route))
+            if series is None:
+                series = self.latency[(method, route)] = [0] * (len(self.buckets) + 2)
+            series[bisect.bisect_left(self.buckets, seconds)] += 1
+            series[-1] += seconds
+
+    # --- Sources read at snapshot time ---
+    def register_cache(self, name: str, cache):
+        """Anything with hits, misses and len()."""
+        self.caches[name] = cache
+
+    def register_gauges(self, name: str, collect: Callable[[], dict]):
+        """`collect` returns {metric suffix: number}, summed across workers."""
+        self.gauges[name] = collect
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            requests = [[*key, count] for key, count in self.requests.items()]
+            latency = [[*key, list(series)] for key, series in self.latency.items()]
+            in_flight = self.in_flight
+        gauges = {}
+        for name, collect in self.gauges.items():
+            try:
+                gauges.update({f"{name}_{suffix}": value for suffix, value in collect().items()})
+            except Exception:
+                logger.exception("Metrics collector %s failed", name)
+        return {
+            "pid": os.getpid(),
+            "buckets": list(self.buckets),
+            "requests": requests,
+            "latency": latency,
+            "in_flight": in_flight,
+            "gauges": gauges,
+            "caches": {name: [cache.hits, cache.misses, len(cache)] for name, cache in self.caches.items()},
+        }
+
+    # --- Snapshot files (one per worker) ---
+    def write(self):
+        if self.directory is None:
+            return
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with open(f"{path}.part", "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f"{path}.part", path)
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.write()
+            except OSError:
+                logger.exception("Metrics snapshot failed")
+
+    def start(self, directory: str, interval: float):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.write()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,), name="metrics-writer", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        if self.directory is not None:
+            # Hand this worker's totals to the archive before its file goes away
+            with _ArchiveLock(self.directory):
+                _archive(self.directory, [self.snapshot()])
+                try:
+                    os.remove(os.path.join(self.directory, f"{os.getpid()}.json"))
+                except FileNotFoundError:
+                    pass
+
+    def collect_all(self, stale_after: float) -> List[dict]:
+        """
+        Fresh snapshot of this worker, the files of the other live workers and
+        the archive. Files of dead workers are archived first. A live worker
+        whose file is stale (stuck, or its writer died) still counts, without
+        its gauges.
+        """
+        snapshots = [self.snapshot()]
+        if self.directory is None:
+            return snapshots
+        now = time.time()
+        with _ArchiveLock(self.directory):
+            dead = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json") or name in (ARCHIVE, f"{os.getpid()}.json"):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    with open(path) as f:
+                        snap = json.load(f)
+                    if not _pid_alive(int(name[:-5])):
+                        dead.append((path, snap))
+                        continue
+                    if now - os.path.getmtime(path) > stale_after:
+                        snap = _counters_only(snap)
+                    snapshots.append(snap)
+                except (OSError, ValueError):
+                    continue
+            if dead:
+                _archive(self.directory, [snap for _, snap in dead])
+                for path, _ in dead:
+                    os.remove(path)
+            archived = _read_archive(self.directory)
+        if archived is not None:
+            snapshots.append(archived)
+        return snapshots
+
+
+# --- Archive of exited workers (read and written under an flock) ---
+class _ArchiveLock:
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, "archive.lock")
+
+    def __enter__(self):
+        self.file = open(self.path, "a")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def _counters_only(snap: dict) -> dict:
+    """What stays meaningful once a worker is gone: counters and histograms, no gauges."""
+    return {
+        "archive": snap.get("archive", False),
+        "buckets": snap["buckets"],
+        "requests": snap["requests"],
+        "latency": snap["latency"],
+        "in_flight": 0,
+        "gauges": {name: value for name, value in snap["gauges"].items() if name.endswith("_total")},
+        "caches": {name: [hits, misses, 0] for name, (hits, misses, _) in snap["caches"].items()},
+    }
+
+
+def _read_archive(directory: str):
+    try:
+        with open(os.path.join(directory, ARCHIVE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _archive(directory: str, snapshots: List[dict]):
+    """Adds the counters of exited workers to archive.json. Caller holds _ArchiveLock."""
+    current = _read_archive(directory)
+    merged = merge([*([current] if current else []), *map(_counters_only, snapshots)])
+    archive = {
+        "archive": True,
+        "buckets": list(merged["buckets"]),
+        "requests": [[*key, count] for key, count in merged["requests"].items()],
+        "latency": [[*key, series] for key, series in merged["latency"].items()],
+        "in_flight": 0,
+        "gauges": merged["gauges"],
+        "caches": merged["caches"],
+    }
+    path = os.path.join(directory, ARCHIVE)
+    with open(f"{path}.part", "w") as f:
+        json.dump(archive, f)
+    os.replace(f"{path}.part", path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: request count, latency histogram and in-flight gauge per route."""
+
+    def __init__(self, app, registry: Metrics = metrics):
+        self.app = app
+        self.metrics = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.metrics.in_flight -= 1
+            self.metrics.observe(scope["method"], route_label(scope, status), status, time.perf_counter() - started)
+
+
+# --- Prometheus text format ---
+def _labels(**labels) -> str:
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}" if labels else ""
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def merge(snapshots: List[dict]) -> dict:
+    """Sums snapshots: counters, histogram series, gauges and cache stats."""
+    requests, latency, gauges, caches = {}, {}, {}, {}
+    in_flight = 0
+    buckets = tuple(snapshots[0]["buckets"]) if snapshots else LATENCY_BUCKETS
+    for snap in snapshots:
+        in_flight += snap["in_flight"]
+        for method, route, status, count in snap["requests"]:
+            requests[(method, route, status)] = requests.get((method, route, status), 0) + count
+        # A snapshot from before a bucket change can't be merged into the histogram
+        if tuple(snap["buckets"]) == buckets:
+            for method, route, series in snap["latency"]:
+                total = latency.setdefault((method, route), [0] * len(series))
+                for i, value in enumerate(series):
+                    total[i] += value
+        for name, value in snap["gauges"].items():
+            gauges[name] = gauges.get(name, 0) + value
+        for name, (hits, misses, size) in snap["caches"].items():
+            total = caches.setdefault(name, [0, 0, 0])
+            total[0] += hits
+            total[1] += misses
+            total[2] += size
+    return {"buckets": buckets, "requests": requests, "latency": latency, "in_flight": in_flight,
+            "gauges": gauges, "caches": caches}
+
+
+def render(snapshots: List[dict]) -> str:
+    """Adds up worker snapshots (and the archive) into Prometheus exposition format."""
+    merged = merge(snapshots)
+    buckets, requests, latency = merged["buckets"], merged["requests"], merged["latency"]
+    gauges, caches, in_flight = merged["gauges"], merged["caches"], merged["in_flight"]
+    workers = sum(1 for snap in snapshots if not snap.get("archive"))
+
+    lines = [
+        f"# HELP {PREFIX}_workers Worker processes included in these metrics.",
+        f"# TYPE {PREFIX}_workers gauge",
+        f"{PREFIX}_workers {workers}",
+        f"# HELP {PREFIX}_http_requests_total HTTP requests by route template and status.",
+        f"# TYPE {PREFIX}_http_requests_total counter",
+    ]
+    for (method, route, status), count in sorted(requests.items()):
+        lines.append(f"{PREFIX}_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+    lines += [
+        f"# HELP {PREFIX}_http_request_duration_seconds Time to serve a request, by route template.",
+        f"# TYPE {PREFIX}_http_request_duration_seconds histogram",
+    ]
+    for (method, route), series in sorted(latency.items()):
+        cumulative = 0
+        for bound, count in zip((*buckets, "+Inf"), series[:-1]):
+            cumulative += count
+            le = bound if bound == "+Inf" else _number(bound)
+            lines.append(f"{PREFIX}_http_request_duration_seconds_bucket"
+                         f"{_labels(method=method, route=route, le=le)} {_number(cumulative)}")
+        lines.append(f"{PREFIX}_http_request_duration_seconds_sum{_labels(method=method, route=route)} "
+                     f"{_number(series[-1])}")
+        lines.append(f"{PREFIX}_http_request_duration_seconds_count{_labels(method=method, route=route)} "
+                     f"{_number(cumulative)}")
+
+    lines += [
+        f"# HELP {PREFIX}_http_requests_in_flight Requests being served right now.",
+        f"# TYPE {PREFIX}_http_requests_in_flight gauge",
+        f"{PREFIX}_http_requests_in_flight {in_flight}",
+    ]
+
+    for name, value in sorted(gauges.items()):
+        kind = "counter" if name.endswith("_total") else "gauge"
+        lines += [f"# TYPE {PREFIX}_{name} {kind}", f"{PREFIX}_{name} {_number(value)}"]
+
+    for metric, index, kind in (("cache_hits_total", 0, "counter"), ("cache_misses_total", 1, "counter"),
+                                ("cache_entries", 2, "gauge")):
+        lines.append(f"# TYPE {PREFIX}_{metric} {kind}")
+        for name, values in sorted(caches.items()):
+            lines.append(f"{PREFIX}_{metric}{_labels(cache=name)} {values[index]}")
+    lines += [
+        f"# HELP {PREFIX}_cache_hit_ratio Hits / (hits + misses), all workers past and present.",
+        f"# TYPE {PREFIX}_cache_hit_ratio gauge",
+    ]
+    for name, (hits, misses, _) in sorted(caches.items()):
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        lines.append(f"{PREFIX}_cache_hit_ratio{_labels(cache=name)} {_number(round(ratio, 4))}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,235 @@
+# app/core/page_cache.py
+"""
+Full-page cache for logged-out visitors on the catalog pages.
+
+Each worker keeps its own pages in memory, but invalidation is shared:
+clear() also rewrites a small generation file (PAGE_CACHE_GENERATION_FILE,
+by default one per uvicorn master), and every lookup stats it. A worker
+that sees the file change drops its pages too, so a product change made in
+one worker is visible from all of them on their next request, not after
+PAGE_CACHE_TTL_SECONDS.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from http.cookies import SimpleCookie
+from typing import Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Response headers that must never be replayed to another visitor
+_PRIVATE_HEADERS = {b"set-cookie"}
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class PageCache:
+    """
+    LRU of rendered pages bounded by total body size (not entry count).
+    Entries also expire `ttl` seconds after they were stored. With
+    `shared_path`, clear() in any process sharing that file clears this one too.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, shared_path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self.shared_path = shared_path
+        self._shared_stamp = self._read_stamp()
+        self._size = 0
+        self._data = OrderedDict()  # key -> (expires_at, status, headers, body, etag)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, key):
+        with self._lock:
+            self._sync()
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry
+                self._evict(key)
+            self.misses += 1
+            return None
+
+    def set(self, key, status: int, headers, body: bytes, etag: str, generation: int):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._sync()
+            # Skip pages rendered before the last invalidation (in any worker)
+            if generation != self.generation:
+                return
+            if key in self._data:
+                self._evict(key)
+            self._data[key] = (time.monotonic() + self.ttl, status, headers, body, etag)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                self._evict(next(iter(self._data)))
+
+    def clear(self):
+        with self._lock:
+            self._drop()
+            if self.shared_path:
+                self._bump_shared()
+
+    def _drop(self):
+        self.generation += 1
+        self._data.clear()
+        self._size = 0
+
+    def _evict(self, key):
+        entry = self._data.pop(key)
+        self._size -= len(entry[3])
+
+    # --- Shared invalidation ---
+    def _read_stamp(self):
+        # Every bump replaces the file, so its inode changes even if mtime resolution is coarse
+        if not self.shared_path:
+            return None
+        try:
+            stat = os.stat(self.shared_path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _sync(self):
+        # One stat per lookup; pages cached before another worker's clear() are dropped
+        stamp = self._read_stamp()
+        if stamp != self._shared_stamp:
+            self._shared_stamp = stamp
+            self._drop()
+
+    def _bump_shared(self):
+        part = f"{self.shared_path}.{os.getpid()}.part"
+        try:
+            with open(part, "w") as f:
+                f.write(f"{time.time_ns()}\n")
+            os.replace(part, self.shared_path)
+        except OSError:
+            # This worker is cleared; the others fall back to PAGE_CACHE_TTL_SECONDS
+            logger.exception("Could not share page cache invalidation via %s", self.shared_path)
+            return
+        self._shared_stamp = self._read_stamp()
+
+
+def default_generation_file() -> str:
+    # Workers of one uvicorn server share a parent, so they share a file
+    return settings.PAGE_CACHE_GENERATION_FILE or os.path.join(
+        tempfile.gettempdir(), f"animerch-page-cache-{os.getppid()}.generation")
+
+
+page_cache = PageCache(max_bytes=settings.PAGE_CACHE_MAX_BYTES, ttl=settings.PAGE_CACHE_TTL_SECONDS,
+                       shared_path=default_generation_file())
+
+
+def _is_anonymous(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"cookie":
+            cookie = SimpleCookie()
+            cookie.load(value.decode("latin-1"))
+            if "access_token" in cookie:
+                return False
+    return True
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+class PageCacheMiddleware:
+    """
+    Pure ASGI middleware for the public catalog pages.
+
+    Logged-out visitors all get the same HTML, so it is cached per
+    (path, query string) and replayed without touching the DB or Jinja.
+    Logged-in visitors always get a fresh render. Every cacheable response
+    carries a strong ETag, and a matching If-None-Match gets an empty 304.
+    """
+
+    def __init__(self, app, paths, cache: PageCache = page_cache):
+        self.app = app
+        self.paths = set(paths)
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        anonymous = _is_anonymous(scope)
+        if_none_match = _header(scope, b"if-none-match")
+        key = (scope["path"], scope["query_string"])
+
+        if anonymous:
+            entry = self.cache.get(key)
+            if entry is not None:
+                _, status, headers, body, etag = entry
+                return await self._send(send, status, headers, body, etag, if_none_match, public=True)
+
+        # Render, buffering the (small) HTML page so the ETag can go in the headers
+        generation = self.cache.generation
+        start = None
+        chunks = []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+
+        if start["status"] != 200:
+            await send(start)
+            return await send({"type": "http.response.body", "body": body})
+
+        etag = make_etag(body)
+        if anonymous:
+            shared_headers = [(k, v) for k, v in start["headers"] if k.lower() not in _PRIVATE_HEADERS]
+            self.cache.set(key, start["status"], shared_headers, body, etag, generation)
+        await self._send(send, start["status"], start["headers"], body, etag, if_none_match, public=anonymous)
+
+    async def _send(self, send, status, headers, body, etag, if_none_match, public: bool):
+        extra = [
+            (b"etag", etag.encode()),
+            # Always revalidate: the page changes as soon as someone logs in
+            (b"cache-control", b"no-cache" if public else b"private, no-cache"),
+            (b"vary", b"Cookie"),
+        ]
+        if etag_matches(if_none_match, etag):
+            await send({"type": "http.response.start", "status": 304, "headers": extra})
+            return await send({"type": "http.response.body", "body": b""})
+
+        headers = [(k, v) for k, v in headers if k.lower() not in (b"etag", b"cache-control", b"vary")] + extra
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
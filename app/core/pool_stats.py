@@ -0,0 +1,131 @@
+# app/core/pool_stats.py
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# ASGI scope of the request being served. Routing fills in scope["route"],
+# so a checkout can be attributed to the route template ("/products/{product_id}").
+current_scope: ContextVar = ContextVar("current_scope", default=None)
+
+def current_route() -> str:
+    scope = current_scope.get()
+    if scope is None:
+        return "<background>"
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path", "<unknown>")
+
+
+class PoolStats:
+    """Counters for connection checkouts: wait time for a connection and how long each route holds one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.routes = {}  # route -> [checkouts, hold_total, hold_max]
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_hold(self, route: str, seconds: float):
+        with self._lock:
+            entry = self.routes.setdefault(route, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "routes": {
+                    route: {
+                        "checkouts": count,
+                        "hold_avg_ms": round(total / count * 1000, 3),
+                        "hold_max_ms": round(longest * 1000, 3),
+                    }
+                    for route, (count, total, longest) in sorted(self.routes.items())
+                },
+            }
+
+
+pool_stats = PoolStats()
+
+
+# --- Pool classes that time how long a checkout waits for a connection ---
+class _TimedCheckoutMixin:
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - start)
+        return connection
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine):
+    """Tracks how long each route keeps a connection checked out."""
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        connection_record.info["route"] = current_route()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is not None:
+            pool_stats.record_hold(connection_record.info.pop("route", "<unknown>"), time.perf_counter() - started)
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"class": type(pool).__name__}
+    return {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+
+class RouteContextMiddleware:
+    """Pure ASGI middleware that exposes the current request scope to pool events."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
@@ -0,0 +1,120 @@
+# app/core/query_stats.py
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Expanded IN lists differ by length only: "IN (?, ?, ?)" and "IN (?)" are the same query
+_IN_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+))+\s*\)")
+
+
+def statement_shape(statement: str) -> str:
+    return _IN_LIST.sub("(?)", " ".join(statement.split()))
+
+
+class NPlusOneError(RuntimeError):
+    """The same statement ran more times in one request than N_PLUS_ONE_THRESHOLD allows."""
+
+
+class RequestQueries:
+    """What one request sent to the database."""
+
+    def __init__(self, threshold: int = 0, raise_on_repeat: bool = False):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self.threshold = threshold
+        self.raise_on_repeat = raise_on_repeat
+
+    def repeated(self):
+        """(count, statement) for every shape over the threshold, worst first."""
+        if not self.threshold:
+            return []
+        return [(count, shape) for shape, count in self.shapes.most_common() if count > self.threshold]
+
+    def server_timing(self, total_seconds: float) -> str:
+        return (f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries", '
+                f"app;dur={total_seconds * 1000:.1f}")
+
+
+# Set per request by QueryStatsMiddleware. The object is shared (not copied)
+# with the threadpool, so sync routes and run_db() count into it too.
+current_queries: ContextVar[Optional[RequestQueries]] = ContextVar("current_queries", default=None)
+
+
+def instrument_queries(engine):
+    """Counts statements and DB time into the current request's RequestQueries."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_queries.get()
+        if stats is None:
+            return
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+        shape = statement_shape(statement)
+        stats.shapes[shape] += 1
+        if stats.raise_on_repeat and stats.threshold and stats.shapes[shape] > stats.threshold:
+            raise NPlusOneError(f"Statement ran {stats.shapes[shape]} times in one request "
+                                f"(N_PLUS_ONE_THRESHOLD={stats.threshold}): {shape[:300]}")
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_queries.get()
+        started = conn.info.get("query_started")
+        if stats is None or not started:
+            return
+        stats.count += 1
+        stats.seconds += time.perf_counter() - started.pop()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # A failed (or refused) statement never reaches after_cursor_execute
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+
+class QueryStatsMiddleware:
+    """
+    Pure ASGI middleware: counts the SQL statements each request runs and
+    how long they took, and reports both in a Server-Timing header
+    (db;dur=<ms>;desc="<n> queries", app;dur=<ms>).
+
+    mode "warn" logs any statement repeated more than `threshold` times
+    in one request (the usual sign of a lazy load in a loop); "raise" makes
+    that request fail with NPlusOneError instead, so tests catch it.
+    """
+
+    def __init__(self, app, mode: str = "off", threshold: int = 10):
+        if mode not in ("off", "warn", "raise"):
+            raise ValueError(f"Unknown N_PLUS_ONE_MODE: {mode!r}")
+        self.app = app
+        self.mode = mode
+        self.threshold = threshold if mode != "off" else 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestQueries(self.threshold, raise_on_repeat=self.mode == "raise")
+        token = current_queries.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timing = stats.server_timing(time.perf_counter() - started).encode()
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_queries.reset(token)
+            if self.mode == "warn":
+                for count, shape in stats.repeated():
+                    logger.warning("N+1 suspect: %s %s ran %dx: %s", scope["method"], scope["path"], count, shape[:300])
@@ -0,0 +1,99 @@
+# app/core/schema.py
+"""
+Database schema check, meant to run once per deploy rather than in every
+worker as it boots.
+
+    python -m app.core.schema            # exit 1 if a table, column, unique key or index is missing
+    python -m app.core.schema --create   # create missing tables (dev; use Alembic in prod)
+
+What a worker does by itself at startup is DB_SCHEMA_ON_STARTUP (app/main.py).
+"""
+import argparse
+import sys
+from typing import List
+from sqlalchemy import UniqueConstraint, inspect
+from app.database import Base, engine
+
+STARTUP_MODES = ("create", "check", "off")
+
+
+def load_models():
+    """Imports every models module, so Base.metadata knows all the tables."""
+    from app.auth import models as auth_models  # noqa: F401
+    from app.products import models as product_models  # noqa: F401
+    from app.cart import models as cart_models  # noqa: F401
+    from app.orders import models as order_models  # noqa: F401
+    from app.profile import models as profile_models  # noqa: F401
+
+
+def missing_schema(bind=engine) -> List[str]:
+    """Tables, columns, unique constraints and indexes the models expect but the database doesn't have."""
+    load_models()
+    inspector = inspect(bind)
+    existing = set(inspector.get_table_names())
+    problems = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            problems.append(f"missing table {table.name}")
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        problems += [f"missing column {table.name}.{column.name}"
+                     for column in table.columns if column.name not in columns]
+        problems += _missing_keys(inspector, table)
+    return problems
+
+
+def _missing_keys(inspector, table) -> List[str]:
+    # Compared by columns, not names: MySQL reports unique constraints as unique
+    # indexes, and unnamed ones (Column(unique=True)) get a generated name.
+    # A missing unique key is not cosmetic: upsert() relies on it.
+    reflected = inspector.get_indexes(table.name)
+    unique = {tuple(uc["column_names"]) for uc in inspector.get_unique_constraints(table.name)}
+    unique |= {tuple(ix["column_names"]) for ix in reflected if ix["unique"]}
+    indexed = unique | {tuple(ix["column_names"]) for ix in reflected}
+
+    problems = []
+    expected_unique = [(uc.name, tuple(column.name for column in uc.columns))
+                       for uc in table.constraints if isinstance(uc, UniqueConstraint)]
+    expected_unique += [(ix.name, tuple(column.name for column in ix.columns)) for ix in table.indexes if ix.unique]
+    for name, key in expected_unique:
+        if key not in unique:
+            label = f"unique key {name}" if name else "unique key"
+            problems.append(f"missing {label} on {table.name}({', '.join(key)})")
+    for ix in table.indexes:
+        key = tuple(column.name for column in ix.columns)
+        if not ix.unique and key not in indexed:
+            problems.append(f"missing index {ix.name} on {table.name}({', '.join(key)})")
+    return problems
+
+
+def create_schema(bind=engine):
+    load_models()
+    Base.metadata.create_all(bind=bind)
+
+
+def prepare_schema(mode: str, bind=engine):
+    """Startup step: "create" missing tables, "check" the schema matches, or "off" (trust the deploy)."""
+    if mode == "create":
+        create_schema(bind)
+    elif mode == "check":
+        problems = missing_schema(bind)
+        if problems:
+            raise RuntimeError("Database schema is out of date (run `python -m app.core.schema --create` "
+                               "or the migrations): " + "; ".join(problems))
+    elif mode != "off":
+        raise ValueError(f"Unknown DB_SCHEMA_ON_STARTUP: {mode!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--create", action="store_true", help="create missing tables first")
+    args = parser.parse_args()
+
+    if args.create:
+        create_schema()
+    problems = missing_schema()
+    for problem in problems:
+        print(problem)
+    print("Schema OK" if not problems else f"{len(problems)} problem(s) found")
+    sys.exit(1 if problems else 0)
@@ -1,4 +1,7 @@
 # app/core/security.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
@@ -13,6 +16,54 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# --- Password hashing off the event loop ---
+# bcrypt costs ~100-300 ms of CPU per call. Running it inline in an async
+# route freezes every other request on the worker, and running it in the
+# shared threadpool lets a login burst starve the sync DB routes. So hashing
+# gets its own bounded pool. bcrypt releases the GIL, so threads are enough;
+# set PASSWORD_HASH_EXECUTOR=process to use processes instead.
+_hash_executor = None
+_hash_executor_lock = threading.Lock()
+_hash_pending = 0
+
+def _get_hash_executor():
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            if settings.PASSWORD_HASH_EXECUTOR == "process":
+                _hash_executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+            else:
+                _hash_executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+                )
+        return _hash_executor
+
+def password_hash_queue_depth() -> int:
+    """Hash/verify calls submitted and not finished yet (running + waiting)."""
+    return _hash_pending
+
+async def _run_in_hash_pool(func, *args):
+    global _hash_pending
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), func, *args)
+    finally:
+        _hash_pending -= 1
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await _run_in_hash_pool(get_password_hash, password)
+
+def shutdown_hash_executor():
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is not None:
+            _hash_executor.shutdown(wait=False, cancel_futures=True)
+            _hash_executor = None
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,220 @@
+# app/core/static.py
+"""
+Static files with fingerprinted URLs, precompressed siblings and long caching.
+
+static_url("css/app.css") returns /static/css/app.<hash>.css, where <hash> is
+taken from the file's bytes when the manifest is built (once per worker, at
+startup). A fingerprinted URL can never change meaning, so it is served with
+a one-year immutable Cache-Control and repeat visits skip revalidation. The
+plain name still works but is always revalidated. Restart to pick up edited
+assets.
+
+Text assets can be precompressed ahead of time:
+
+    python -m app.core.static
+
+which writes app.css.gz (and app.css.br if the brotli package is installed)
+next to each file; they are served instead of the original when the client
+accepts that encoding.
+"""
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import threading
+from typing import Dict, Optional, Tuple
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join("app", "static")
+STATIC_URL = "/static"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# User content: large, ever-growing, and never hashed at startup
+SKIP_DIRS = ("uploads", "profiles")
+# Every name in here is unique (a content hash or a uuid) and never rewritten
+IMMUTABLE_DIRS = ("uploads/",)
+
+# Best first; only files with these extensions get precompressed siblings
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html", ".xml", ".map", ".ico"}
+
+FINGERPRINT_LENGTH = 12
+_FINGERPRINTED = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$" % FINGERPRINT_LENGTH)
+
+
+def _accepted_encodings(header: str) -> set:
+    """Encodings named in Accept-Encoding, minus any refused with q=0."""
+    accepted = set()
+    for part in header.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        if name:
+            accepted.add(name.strip())
+    return accepted
+
+
+def _fingerprinted_name(path: str, digest: str) -> str:
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    """StaticFiles plus fingerprinted names, precompressed siblings and Cache-Control."""
+
+    def __init__(self, *, directory: str, url_prefix: str = STATIC_URL, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.url_prefix = url_prefix.rstrip("/")
+        self._lock = threading.Lock()
+        self._urls: Optional[Dict[str, str]] = None  # "css/app.css" -> "css/app.<hash>.css"
+        self._originals: Dict[str, str] = {}          # and back
+        self._encoded: Dict[str, Tuple[str, ...]] = {}  # "css/app.css" -> ("br", "gzip")
+
+    # --- Manifest ---
+    def build_manifest(self):
+        """Hashes every asset outside SKIP_DIRS. Cheap: a few small files."""
+        urls, originals, encoded = {}, {}, {}
+        for root, dirs, files in os.walk(self.directory):
+            rel_root = os.path.relpath(root, self.directory).replace(os.sep, "/")
+            if rel_root == ".":
+                rel_root = ""
+                dirs[:] = [name for name in dirs if name not in SKIP_DIRS]
+            names = set(files)
+            for name in files:
+                if name.startswith(".") or name.endswith((".gz", ".br")):
+                    continue
+                rel = f"{rel_root}/{name}" if rel_root else name
+                with open(os.path.join(root, name), "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                urls[rel] = _fingerprinted_name(rel, digest)
+                originals[urls[rel]] = rel
+                available = tuple(encoding for encoding, suffix in ENCODINGS if name + suffix in names)
+                if available:
+                    encoded[rel] = available
+        with self._lock:
+            self._urls, self._originals, self._encoded = urls, originals, encoded
+
+    def _manifest(self) -> Dict[str, str]:
+        if self._urls is None:
+            self.build_manifest()
+        return self._urls
+
+    def url_for(self, path: str) -> str:
+        """URL for a file under the static directory; fingerprinted when it is in the manifest."""
+        path = path.lstrip("/")
+        return f"{self.url_prefix}/{self._manifest().get(path, path)}"
+
+    # --- Serving ---
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        self._manifest()
+        rel = path.replace(os.sep, "/")
+        original = self._originals.get(rel)
+        immutable = original is not None or rel.startswith(IMMUTABLE_DIRS)
+        if original is None:
+            match = _FINGERPRINTED.match(rel)
+            if match and f"{match['stem']}{match['ext']}" in self._urls:
+                # A fingerprint from another deploy: serve the current file, revalidated
+                original = f"{match['stem']}{match['ext']}"
+
+        target = original or rel
+        response = await self._respond(target, scope) or await super().get_response(target, scope)
+        if target in self._encoded:
+            response.headers["vary"] = "Accept-Encoding"
+        if response.status_code < 400:
+            response.headers["cache-control"] = IMMUTABLE if immutable else REVALIDATE
+        return response
+
+    async def _respond(self, rel: str, scope: Scope) -> Optional[Response]:
+        """The precompressed sibling of `rel` if the client takes one, else None."""
+        available = self._encoded.get(rel)
+        if not available or scope["method"] not in ("GET", "HEAD"):
+            return None
+        request_headers = Headers(scope=scope)
+        accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+        for encoding, suffix in ENCODINGS:
+            if encoding not in available or encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, rel + suffix)
+            if not stat_result or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            response = FileResponse(
+                full_path,
+                stat_result=stat_result,
+                media_type=mimetypes.guess_type(rel)[0] or "text/plain",
+                headers={"content-encoding": encoding, "vary": "Accept-Encoding"},
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
+
+
+# One manifest per worker, built on first use (or in the lifespan)
+static_files = FingerprintedStaticFiles(directory=STATIC_DIR)
+
+def static_url(path: str) -> str:
+    return static_files.url_for(path)
+
+
+# --- Precompression (build step) ---
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    # mtime=0 keeps the output (and its ETag) stable between builds
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def precompress(directory: str = STATIC_DIR, min_size: int = 256) -> int:
+    """Writes .gz/.br siblings for compressible assets that changed. Returns the count written."""
+    encodings = [(encoding, suffix) for encoding, suffix in ENCODINGS if encoding != "br" or brotli is not None]
+    written = 0
+    for root, dirs, files in os.walk(directory):
+        if os.path.samefile(root, directory):
+            dirs[:] = [name for name in dirs if name not in SKIP_DIRS]
+        for name in files:
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE:
+                continue
+            source = os.path.join(root, name)
+            if os.path.getsize(source) < min_size:
+                continue
+            with open(source, "rb") as f:
+                data = f.read()
+            for encoding, suffix in encodings:
+                target = source + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                    continue
+                compressed = _compress(data, encoding)
+                if len(compressed) >= len(data):
+                    continue
+                with open(f"{target}.part", "wb") as f:
+                    f.write(compressed)
+                os.replace(f"{target}.part", target)
+                written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write precompressed .gz/.br siblings for static text assets.")
+    parser.add_argument("--directory", default=STATIC_DIR)
+    args = parser.parse_args()
+    if brotli is None:
+        print("brotli is not installed: writing gzip only")
+    print(f"Wrote {precompress(args.directory)} precompressed files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# app/core/templating.py
+"""
+The one template environment every router renders with (`templates`).
+
+Compiled templates are kept in memory per worker and, as bytecode, on disk
+(TEMPLATE_CACHE_DIR), so a fresh worker loads them instead of parsing
+them again. To fill the disk cache at deploy time:
+
+    python -m app.core.templating
+"""
+import argparse
+import re
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from jinja2.ext import Extension
+from app.core.config import settings
+from app.core.static import static_url
+from app.core.thumbnails import responsive_img
+
+# A line holding nothing but one {% ... %} tag
+_BLOCK_TAG_LINE = re.compile(r"^\{%[^%]*%\}$")
+_PRESERVE_OPEN = re.compile(r"<(pre|textarea)\b", re.IGNORECASE)
+_PRESERVE_CLOSE = re.compile(r"</(pre|textarea)\s*>", re.IGNORECASE)
+
+
+def strip_whitespace(source: str) -> str:
+    """
+    Removes indentation, blank lines and the line breaks after tag-only lines.
+    Newlines between content lines are kept (they can matter in inline
+    scripts and between inline elements); <pre>/<textarea> bodies are untouched.
+    """
+    out = []
+    preserving = False
+    for line in source.split("\n"):
+        if preserving:
+            out.append(line + "\n")
+            preserving = not _PRESERVE_CLOSE.search(line)
+            continue
+        stripped = line.strip()
+        if _PRESERVE_OPEN.search(stripped) and not _PRESERVE_CLOSE.search(stripped):
+            preserving = True
+            out.append(line.lstrip() + "\n")
+        elif not stripped:
+            continue
+        elif _BLOCK_TAG_LINE.match(stripped):
+            out.append(stripped)
+        else:
+            out.append(stripped + "\n")
+    return "".join(out)
+
+
+class StripWhitespaceExtension(Extension):
+    """Applies strip_whitespace() to template source before it is compiled, so it costs nothing per render."""
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(strip_whitespace=True)
+
+    def preprocess(self, source, name, filename=None):
+        if not self.environment.strip_whitespace:
+            return source
+        return strip_whitespace(source)
+
+
+TEMPLATE_DIR = "templates"
+
+
+def build_environment() -> Environment:
+    extensions = [StripWhitespaceExtension] if settings.TEMPLATE_STRIP_WHITESPACE else []
+    bytecode_cache = None
+    if settings.TEMPLATE_BYTECODE_CACHE:
+        # Bytecode is keyed on the raw source, so stripped and unstripped builds get their own files
+        pattern = f"__animerch_{'stripped' if extensions else 'raw'}_%s.cache"
+        bytecode_cache = FileSystemBytecodeCache(settings.TEMPLATE_CACHE_DIR or None, pattern)
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=True,
+        auto_reload=settings.TEMPLATE_AUTO_RELOAD,
+        bytecode_cache=bytecode_cache,
+        extensions=extensions,
+    )
+    env.globals["responsive_img"] = responsive_img
+    env.globals["static_url"] = static_url
+    return env
+
+
+templates = Jinja2Templates(env=build_environment())
+
+
+def precompile(env: Environment = templates.env) -> int:
+    """Compiles every template, which also writes its bytecode cache file. Returns the count."""
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+    if templates.env.bytecode_cache is None:
+        raise SystemExit("TEMPLATE_BYTECODE_CACHE is off: nothing to write")
+    print(f"Compiled {precompile()} templates")
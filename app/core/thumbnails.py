@@ -0,0 +1,247 @@
+# app/core/thumbnails.py
+"""
+Resized WebP/JPEG variants of uploaded images, built in a background
+process pool so a big upload never slows a request down.
+
+Variants are written next to the uploads as
+    uploads/thumbs/<name>-<width>.webp / .jpg
+plus a uploads/thumbs/<name>.json marker written last, so a variant set is
+only ever used once it is complete. Upload names are unique (and usually a
+content hash), so a ready set never changes and is remembered forever.
+
+Pillow is optional: without it nothing is queued and pages keep using the
+original images. To build variants for images uploaded earlier:
+
+    python -m app.core.thumbnails
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from html import escape
+from typing import Optional, Tuple
+from markupsafe import Markup
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_URL = "/static/"
+STATIC_DIR = os.path.join("app", "static")
+UPLOADS_URL = "/static/uploads/"
+THUMBS_SUBDIR = "thumbs"
+
+THUMB_WIDTHS = (160, 320, 640)
+THUMB_FORMATS = (
+    ("webp", "WEBP", {"quality": 80, "method": 4}),
+    ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+)
+
+
+# --- Paths ---
+def _split(image_url: str) -> Optional[Tuple[str, str]]:
+    """(directory URL, file stem) for an uploaded image, None for anything else."""
+    if not image_url or not image_url.startswith(UPLOADS_URL) or "/" in image_url[len(UPLOADS_URL):]:
+        return None
+    directory, filename = image_url.rsplit("/", 1)
+    return directory, os.path.splitext(filename)[0]
+
+def _url_to_path(url: str) -> str:
+    return os.path.join(STATIC_DIR, *url[len(STATIC_URL):].split("/"))
+
+def variant_url(image_url: str, width: int, extension: str) -> str:
+    directory, stem = _split(image_url)
+    return f"{directory}/{THUMBS_SUBDIR}/{stem}-{width}.{extension}"
+
+def _marker_path(image_url: str) -> str:
+    directory, stem = _split(image_url)
+    return _url_to_path(f"{directory}/{THUMBS_SUBDIR}/{stem}.json")
+
+
+# --- The job (runs in a worker process) ---
+def _flatten(image):
+    # JPEG has no alpha: put transparent images on white instead of black
+    if image.mode == "RGB":
+        return image
+    rgba = image.convert("RGBA")
+    background = Image.new("RGB", rgba.size, (255, 255, 255))
+    background.paste(rgba, mask=rgba.getchannel("A"))
+    return background
+
+def _save_atomic(image, path: str, image_format: str, options: dict):
+    temp_path = f"{path}.{os.getpid()}.part"
+    image.save(temp_path, image_format, **options)
+    os.replace(temp_path, path)
+
+def render_variants(source_path: str, thumbs_dir: str, stem: str) -> Tuple[int, ...]:
+    """Writes every variant narrower than the original, then the marker. Returns the widths."""
+    os.makedirs(thumbs_dir, exist_ok=True)
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+
+        widths = tuple(width for width in THUMB_WIDTHS if width < image.width)
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            for extension, image_format, options in THUMB_FORMATS:
+                frame = _flatten(resized) if image_format == "JPEG" else resized
+                _save_atomic(frame, os.path.join(thumbs_dir, f"{stem}-{width}.{extension}"), image_format, options)
+
+    marker = os.path.join(thumbs_dir, f"{stem}.json")
+    with open(f"{marker}.part", "w") as f:
+        json.dump({"widths": widths}, f)
+    os.replace(f"{marker}.part", marker)
+    return widths
+
+
+# --- Pool (one per worker process, started on first use) ---
+_executor = None
+_lock = threading.Lock()
+_in_flight = set()
+# Widths per image, from its marker file. An LRU like the other per-worker caches:
+# content-addressed uploads only ever add URLs, and a dropped entry is one file read
+_ready = TTLCache(maxsize=10000, ttl=3600)
+# Images without variants yet are re-checked on disk every few seconds
+# (another worker may have built them)
+_missing = TTLCache(maxsize=10000, ttl=5)
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            # spawn, not fork: forking a process that is running threads can deadlock
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=200,
+            )
+        return _executor
+
+def _load_marker(image_url: str) -> Optional[Tuple[int, ...]]:
+    widths = _ready.get(image_url)
+    if widths is not None:
+        return widths
+    if _missing.get(image_url):
+        return None
+    try:
+        with open(_marker_path(image_url)) as f:
+            widths = tuple(json.load(f)["widths"])
+    except (OSError, ValueError, KeyError):
+        _missing.set(image_url, True)
+        return None
+    _ready.set(image_url, widths)
+    return widths
+
+def ready_widths(image_url: str) -> Tuple[int, ...]:
+    """Widths whose variants exist for this image (empty until the job has run)."""
+    if _split(image_url) is None:
+        return ()
+    return _load_marker(image_url) or ()
+
+def _job_done(image_url: str, future):
+    with _lock:
+        _in_flight.discard(image_url)
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error("Thumbnail job failed for %s", image_url, exc_info=error)
+        return
+    _ready.set(image_url, future.result())
+    _missing.pop(image_url)
+
+def queue_thumbnails(image_url: str) -> bool:
+    """Queues variant generation for an uploaded image. Returns False if nothing was queued."""
+    if Image is None or not settings.THUMBNAILS_ENABLED or _split(image_url) is None:
+        return False
+    _missing.pop(image_url)
+    if _load_marker(image_url) is not None:
+        return False
+    with _lock:
+        if image_url in _in_flight:
+            return False
+        _in_flight.add(image_url)
+
+    directory, stem = _split(image_url)
+    future = _get_executor().submit(
+        render_variants, _url_to_path(image_url), _url_to_path(f"{directory}/{THUMBS_SUBDIR}"), stem
+    )
+    future.add_done_callback(partial(_job_done, image_url))
+    return True
+
+def shutdown_thumbnail_executor():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+# --- Template helper ---
+def _attrs(attrs: dict) -> str:
+    return " ".join(f'{name}="{escape(str(value))}"' for name, value in attrs.items() if value is not None)
+
+def responsive_img(image_url: str, sizes: str = "100vw", **attrs) -> Markup:
+    """
+    <img> for an uploaded image. Once its variants are ready it becomes a
+    <picture> with a WebP srcset and a JPEG srcset, so the browser downloads
+    the smallest file that fills `sizes`. Until then it is the plain original.
+    """
+    img_attrs = {"src": image_url, **attrs}
+    widths = ready_widths(image_url)
+    if not widths:
+        return Markup(f"<img {_attrs(img_attrs)}>")
+
+    webp = ", ".join(f"{variant_url(image_url, width, 'webp')} {width}w" for width in widths)
+    jpeg = ", ".join(f"{variant_url(image_url, width, 'jpg')} {width}w" for width in widths)
+    img_attrs = {"src": image_url, "srcset": jpeg, "sizes": sizes, **attrs}
+    # display: contents keeps the <img> sized by its container, as before
+    return Markup(
+        f'<picture style="display: contents">'
+        f'<source type="image/webp" {_attrs({"srcset": webp, "sizes": sizes})}>'
+        f"<img {_attrs(img_attrs)}>"
+        f"</picture>"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build missing thumbnail variants for every uploaded image.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    if Image is None:
+        parser.error("Pillow is not installed")
+
+    uploads_dir = _url_to_path(UPLOADS_URL.rstrip("/"))
+    thumbs_dir = os.path.join(uploads_dir, THUMBS_SUBDIR)
+    pending = [
+        name for name in sorted(os.listdir(uploads_dir))
+        if not name.startswith(".") and os.path.isfile(os.path.join(uploads_dir, name))
+        and not os.path.exists(os.path.join(thumbs_dir, f"{os.path.splitext(name)[0]}.json"))
+    ]
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        jobs = {
+            pool.submit(render_variants, os.path.join(uploads_dir, name), thumbs_dir, os.path.splitext(name)[0]): name
+            for name in pending
+        }
+        for job in as_completed(jobs):
+            if job.exception() is not None:
+                failed += 1
+                print(f"{jobs[job]}: {job.exception()!r}")
+    print(f"Built variants for {len(pending) - failed} of {len(pending)} images")
+
+
+if __name__ == "__main__":
+    main()
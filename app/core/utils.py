@@ -0,0 +1,45 @@
+# app/core/utils.py
+import importlib
+from typing import Dict, List, Sequence
+from sqlalchemy.orm import Session
+
+
+def upsert(db: Session, model, rows: List[Dict], keys: Sequence[str], increment: Sequence[str] = (),
+           replace: Sequence[str] = ()):
+    """
+    Inserts `rows` in one statement; rows that collide on the unique `keys`
+    update the existing row instead. Columns in `increment` are added to the
+    stored value, columns in `replace` overwrite it. With neither, collisions
+    are left alone.
+
+    Uses ON CONFLICT on SQLite/PostgreSQL and ON DUPLICATE KEY UPDATE on MySQL
+    (which matches on any unique key, so `keys` must be the only one there).
+    """
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        # Dialect modules are imported on first use: the PostgreSQL one alone is slow to load
+        stmt = importlib.import_module(f"sqlalchemy.dialects.{dialect}").insert(table)
+        new = stmt.excluded
+        changes = {**{col: table.c[col] + new[col] for col in increment},
+                   **{col: new[col] for col in replace}}
+        if changes:
+            stmt = stmt.on_conflict_do_update(index_elements=list(keys), set_=changes)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(keys))
+    elif dialect in ("mysql", "mariadb"):
+        stmt = importlib.import_module("sqlalchemy.dialects.mysql").insert(table)
+        new = stmt.inserted
+        changes = {**{col: table.c[col] + new[col] for col in increment},
+                   **{col: new[col] for col in replace}}
+        if not changes:
+            # A no-op update keeps the existing row (INSERT IGNORE would also hide real errors)
+            changes = {keys[0]: table.c[keys[0]]}
+        stmt = stmt.on_duplicate_key_update(**changes)
+    else:
+        raise NotImplementedError(f"upsert() does not support the {dialect} dialect")
+
+    db.execute(stmt, rows)
@@ -1,16 +1,30 @@
 # app/database.py
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base # Add this import if missing
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.core.pool_stats import TimedQueuePool, TimedAsyncQueuePool, instrument_engine
+from app.core.query_stats import instrument_queries
 
-# --- DEBUG LINE ---
-print("--------------------------------------------------")
-print(f"DEBUG: The DB URL is: {settings.DATABASE_URL}")
-print("--------------------------------------------------")
-# ------------------
+def pool_options(url: str, queue_pool_class) -> dict:
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    # In-memory SQLite needs its special single-connection pool
+    if ":memory:" not in url and "mode=memory" not in url:
+        options.update(
+            poolclass=queue_pool_class,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
 
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(settings.DATABASE_URL, **pool_options(settings.DATABASE_URL, TimedQueuePool))
+instrument_engine(engine)
+instrument_queries(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -20,4 +34,61 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# --- Async engine (only built when USE_ASYNC_DB is on) ---
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "mysql+mysqlconnector": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
+
+def get_async_database_url() -> str:
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    scheme, sep, rest = settings.DATABASE_URL.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.USE_ASYNC_DB:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_url = get_async_database_url()
+    async_engine = create_async_engine(async_url, **pool_options(async_url, TimedAsyncQueuePool))
+    instrument_engine(async_engine.sync_engine)
+    instrument_queries(async_engine.sync_engine)
+    # Rows are rendered after the session is gone, so don't expire them on commit
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_read_db():
+    """
+    Session for the hot read routes: an AsyncSession when USE_ASYNC_DB is on,
+    a regular Session otherwise. Always query it through run_db().
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Runs fn(session, *args, **kwargs), written against the normal sync
+    Session API, without blocking the event loop.
+
+    With a sync Session it runs in the threadpool. With an AsyncSession it
+    runs through run_sync, so every query is awaited on the loop. Either way
+    fn must eager-load whatever the template reads, because a lazy load after
+    this returns would run outside of it.
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(fn, db, *args, **kwargs)
+    return await db.run_sync(fn, *args, **kwargs)
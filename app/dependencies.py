@@ -0,0 +1,59 @@
+# app/dependencies.py
+from typing import Optional
+from fastapi import Depends, Request
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.auth.models import User
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import get_current_user_from_cookie
+
+# Logged-in users keyed by token subject (email).
+# Rows are expunged from their session before caching, so any request can read them.
+user_cache = TTLCache(maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+def invalidate_user(email: str):
+    """
+    Drops a cached user. Call this after changing anything the templates or
+    permission checks read from the row (username, avatar, role...).
+    """
+    user_cache.pop(email)
+
+def _load_user(db: Session, payload: dict) -> Optional[User]:
+    # Newer tokens carry the user id, so a miss is a primary-key lookup
+    user_id = payload.get("uid")
+    if user_id is not None:
+        user = db.get(User, user_id)
+        if user and user.email != payload["sub"]:
+            user = None
+    else:
+        user = db.query(User).filter(User.email == payload["sub"]).first()
+
+    if user is not None:
+        db.expunge(user)
+    # Hand the connection back now: sync routes wait for a threadpool slot
+    # after this, and holding a pooled connection meanwhile can starve the pool
+    db.close()
+    return user
+
+# --- DEPENDENCY: CURRENT USER ---
+def get_current_user(request: Request, db: Session = Depends(get_db)) -> Optional[User]:
+    """
+    Returns the logged-in user, or None for anonymous visitors.
+    Resolved at most once per request (the result is kept on request.state).
+    """
+    user = getattr(request.state, "user", False)
+    if user is not False:
+        return user
+
+    user = None
+    payload = get_current_user_from_cookie(request)
+    if payload:
+        user = user_cache.get(payload["sub"])
+        if user is None:
+            user = _load_user(db, payload)
+            if user is not None:
+                user_cache.set(payload["sub"], user)
+
+    request.state.user = user
+    return user
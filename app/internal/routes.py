@@ -0,0 +1,49 @@
+# app/internal/routes.py
+import hmac
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from app.auth.models import User
+from app.database import engine, async_engine
+from app.core.config import settings
+from app.core.metrics import metrics, render
+from app.core.pool_stats import pool_stats, pool_status
+from app.dependencies import get_current_user
+
+router = APIRouter()
+# Mounted at the app root: scrapers expect /metrics
+metrics_router = APIRouter()
+
+# --- DEPENDENCY: ADMINS ONLY ---
+def require_admin(user: User = Depends(get_current_user)):
+    if not user or user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+    return user
+
+# --- Connection Pool Stats (this worker only) ---
+@router.get("/pool-stats")
+async def get_pool_stats(reset: bool = False, user: User = Depends(require_admin)):
+    stats = {
+        "pools": {"sync": pool_status(engine)},
+        **pool_stats.snapshot(),
+    }
+    if async_engine is not None:
+        stats["pools"]["async"] = pool_status(async_engine.sync_engine)
+    if reset:
+        pool_stats.reset()
+    return stats
+
+# --- Prometheus metrics (every worker) ---
+def require_metrics_token(request: Request):
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=403, detail="Set METRICS_TOKEN to enable /metrics")
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(supplied.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    # Other workers' snapshots are files; read them off the event loop
+    stale_after = max(30.0, 3 * settings.METRICS_WRITE_INTERVAL_SECONDS)
+    snapshots = await run_in_threadpool(metrics.collect_all, stale_after)
+    return PlainTextResponse(render(snapshots), media_type="text/plain; version=0.0.4; charset=utf-8")
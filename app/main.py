@@ -1,38 +1,103 @@
 # app/main.py
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI, Request,Depends
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
+from app.core.templating import templates
 from app.auth import routes as auth_routes
-from app.database import engine, Base
 from sqlalchemy.orm import Session
 from app.products import routes as product_routes
 from app.products import models as product_models # Import to create tables
-from app.database import engine, Base, get_db
+from app.products.pagination import get_catalog_page
+from app.products.search import search_index
+from app.database import engine, get_read_db, run_db, SessionLocal, async_engine
 from app.cart import routes as cart_routes
 from app.cart import models as cart_models
+from app.cart.store import cart_store
 from app.orders import routes as order_routes
 from app.orders import models as order_models
 from app.auth.models import User # Import User model
-from app.core.security import get_current_user_from_cookie # Import security helper
+from app.dependencies import get_current_user
+from app.core.security import shutdown_hash_executor, password_hash_queue_depth
+from app.core.static import static_files
+from app.core.thumbnails import shutdown_thumbnail_executor
 from app.profile import routes as profile_routes
+from app.profile import models as profile_models
 from app.merch import routes as merch_routes
 from app.manga import routes as manga_routes
 from app.admin import routes as admin_routes
-
-
-
-
-
-# Create tables (for dev only - use Alembic in prod)
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="Animerch")
-
-# Mount Static Files (CSS, Images)
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-
-# Templates
-templates = Jinja2Templates(directory="templates")
+from app.internal import routes as internal_routes
+from app.core.pool_stats import RouteContextMiddleware, pool_stats, pool_status
+from app.core.page_cache import PageCacheMiddleware, page_cache
+from app.core.metrics import MetricsMiddleware, metrics, default_metrics_dir
+from app.dependencies import user_cache
+from app.products.cache import recent_items_cache, recent_strip_cache
+from app.manga.jikan import jikan
+from app.core.compression import CompressionMiddleware
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.config import settings
+from app.core.schema import prepare_schema
+from app.utils import UPLOAD_DIR
+
+
+
+
+
+# Nothing above touches the database or the disk: a worker's setup all happens here
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables (for dev only - use Alembic in prod), check them, or trust the deploy
+    prepare_schema(settings.DB_SCHEMA_ON_STARTUP)
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    # Build the in-memory product search index (one per worker). In the
+    # background, its thread builds it (retrying until it works) before refreshing.
+    if not settings.SEARCH_INDEX_IN_BACKGROUND:
+        db = SessionLocal()
+        try:
+            search_index.build(db)
+        finally:
+            db.close()
+    search_index.start(SessionLocal, settings.SEARCH_INDEX_REFRESH_SECONDS, settings.SEARCH_INDEX_REBUILD_SECONDS)
+    # Fingerprint the static assets before the first page links to them
+    static_files.build_manifest()
+    cart_store.start()
+    if settings.METRICS_ENABLED:
+        metrics.start(default_metrics_dir(), settings.METRICS_WRITE_INTERVAL_SECONDS)
+    yield
+    search_index.close()
+    metrics.close()
+    cart_store.close()
+    shutdown_hash_executor()
+    shutdown_thumbnail_executor()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+app = FastAPI(title="Animerch", lifespan=lifespan)
+
+# Each add_middleware wraps the ones before it, so requests pass through
+# Metrics -> Compression -> QueryStats -> PageCache -> RouteContext -> routes
+
+# Lets DB pool events know which route checked out a connection
+app.add_middleware(RouteContextMiddleware)
+
+# Catalog pages served from memory (with ETag/304) for logged-out visitors
+app.add_middleware(PageCacheMiddleware, paths=["/", "/merch/", "/manga/", "/manga/physical", "/manga/ebooks"])
+
+# SQL count and DB time per request (Server-Timing), plus the N+1 check; outside the page cache
+if settings.QUERY_STATS_ENABLED:
+    app.add_middleware(QueryStatsMiddleware, mode=settings.N_PLUS_ONE_MODE, threshold=settings.N_PLUS_ONE_THRESHOLD)
+
+# Outside the page cache, so cached pages are stored uncompressed and encoded per client
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
+
+# Request counts, latency histograms and in-flight requests per route. Outermost: it
+# times compression too and sees compressed responses
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Mount Static Files (CSS, Images): fingerprinted URLs, precompressed siblings, long caching
+app.mount("/static", static_files, name="static")
 
 # Include Routers
 app.include_router(auth_routes.router, prefix="/auth", tags=["Auth"])
@@ -43,6 +108,32 @@ app.include_router(profile_routes.router, prefix="/profile", tags=["Profile"])
 app.include_router(merch_routes.router, prefix="/merch", tags=["Merch"])
 app.include_router(manga_routes.router, prefix="/manga", tags=["Manga"])
 app.include_router(admin_routes.router, prefix="/admin", tags=["Admin"])
+app.include_router(internal_routes.router, prefix="/internal", tags=["Internal"])
+if settings.METRICS_ENABLED:
+    app.include_router(internal_routes.metrics_router, tags=["Internal"])
+
+# --- What /metrics reports besides requests ---
+def _pool_gauges(engine):
+    def collect():
+        status = pool_status(engine)
+        return {key: value for key, value in status.items() if key != "class"}
+    return collect
+
+metrics.register_gauges("db_pool", _pool_gauges(engine))
+if async_engine is not None:
+    metrics.register_gauges("db_async_pool", _pool_gauges(async_engine.sync_engine))
+# Checkout counters cover both pools
+metrics.register_gauges("db_pool_checkout", lambda: {
+    "total": pool_stats.checkouts,
+    "timeouts_total": pool_stats.timeouts,
+    "wait_seconds_total": pool_stats.wait_total,
+})
+metrics.register_gauges("password_hash", lambda: {"queue_depth": password_hash_queue_depth()})
+metrics.register_cache("page", page_cache)
+metrics.register_cache("user", user_cache)
+metrics.register_cache("recent_items", recent_items_cache)
+metrics.register_cache("recent_strip", recent_strip_cache)
+metrics.register_cache("jikan", jikan._cache)
 
 
 
@@ -52,17 +143,20 @@ app.include_router(admin_routes.router, prefix="/admin", tags=["Admin"])
 
 
 @app.get("/")
-async def home(request: Request, db: Session = Depends(get_db)):
-    products = db.query(product_models.Product).all()
-    
-    # Get current user to check role in template
-    user = None
-    user_payload = get_current_user_from_cookie(request)
-    if user_payload:
-        user = db.query(User).filter(User.email == user_payload["sub"]).first()
+async def home(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    user: Optional[User] = Depends(get_current_user),
+):
+    # One bounded page of the catalog, categories loaded in the same query
+    products, next_cursor = await run_db(db, get_catalog_page, cursor=cursor, limit=limit)
 
     return templates.TemplateResponse("index.html", {
         "request": request, 
         "products": products,
+        "next_cursor": next_cursor,
+        "is_first_page": cursor is None,
         "user": user # Pass user to template
     })
\ No newline at end of file
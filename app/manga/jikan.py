@@ -0,0 +1,174 @@
+# app/manga/jikan.py
+"""
+Server-side client for the Jikan API (https://jikan.moe), shared by every
+visitor of this worker.
+
+- Responses are cached for JIKAN_CACHE_TTL_SECONDS. For another
+  JIKAN_STALE_SECONDS they are still served, while one background request
+  refreshes them; the same stale copy also covers Jikan being down.
+- Concurrent requests for the same URL share one upstream call.
+- A token bucket keeps us under Jikan's rate limit, and every call has a timeout.
+
+Point JIKAN_BASE_URL at a local stub server to run without the real API.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_RESPONSE_BYTES = 2 * 1024 * 1024
+USER_AGENT = "Animerch/1.0"
+
+
+class JikanError(Exception):
+    """Jikan could not answer: `status` is what the proxy should return."""
+
+    def __init__(self, status: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+class TokenBucket:
+    """Thread-safe rate limiter: `rate` calls per second, bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Takes a token, possibly one that only becomes available later.
+        Returns how long to wait before using it, or None (and takes
+        nothing) if that would be longer than `max_wait`.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+class JikanClient:
+    def __init__(self, base_url: str, timeout: float, ttl: float, stale: float, rate: float, burst: int,
+                 max_entries: int):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.ttl = ttl
+        self.bucket = TokenBucket(rate, burst)
+        self.upstream_calls = 0
+        # url -> (fetched_at, body); kept for the fresh and the stale window
+        self._cache = TTLCache(maxsize=max_entries, ttl=ttl + stale)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def url(self, path: str, params: dict) -> str:
+        # Sorted, so the same query always maps to the same cache entry
+        query = urllib.parse.urlencode(sorted((k, v) for k, v in params.items() if v is not None))
+        return f"{self.base_url}/{path.lstrip('/')}" + (f"?{query}" if query else "")
+
+    # --- Upstream call (blocking, runs in the threadpool) ---
+    def _get(self, url: str) -> bytes:
+        self.upstream_calls += 1
+        request = urllib.request.Request(url, headers={"Accept": "application/json", "User-Agent": USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read(MAX_RESPONSE_BYTES + 1)
+        except urllib.error.HTTPError as exc:
+            # Pass client errors through; anything else is Jikan's problem
+            status = exc.code if exc.code in (400, 404) else 502
+            raise JikanError(status, f"Jikan returned {exc.code}")
+        except TimeoutError:
+            raise JikanError(504, "Jikan timed out")
+        except (urllib.error.URLError, OSError) as exc:
+            reason = getattr(exc, "reason", exc)
+            if isinstance(reason, TimeoutError):
+                raise JikanError(504, "Jikan timed out")
+            raise JikanError(502, "Jikan unreachable")
+        if len(body) > MAX_RESPONSE_BYTES:
+            raise JikanError(502, "Jikan response too large")
+        return body
+
+    def fetch_json(self, path: str, params: dict) -> dict:
+        """Blocking, uncached call for scripts (seed_db.py). Still rate limited."""
+        wait = self.bucket.reserve(max_wait=self.timeout)
+        if wait is None:
+            raise JikanError(503, "Jikan rate limit reached")
+        time.sleep(wait)
+        return json.loads(self._get(self.url(path, params)))
+
+    # --- Cached, coalesced access (async, for the proxy routes) ---
+    async def get(self, path: str, params: dict) -> Tuple[bytes, str]:
+        """Returns (JSON body, cache status): "HIT", "STALE" or "MISS"."""
+        url = self.url(path, params)
+        entry = self._cache.get(url)
+        if entry is not None:
+            fetched_at, body = entry
+            if time.monotonic() - fetched_at < self.ttl:
+                return body, "HIT"
+            self._refresh_in_background(url)
+            return body, "STALE"
+        return await self._fetch(url), "MISS"
+
+    def _fetch_task(self, url: str) -> asyncio.Future:
+        # Everyone asking for `url` while a call is running waits on the same task
+        task = self._in_flight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._call_upstream(url))
+            self._in_flight[url] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(url, None))
+        return task
+
+    async def _fetch(self, url: str) -> bytes:
+        # shield: one visitor hanging up must not cancel the call for the others
+        return await asyncio.shield(self._fetch_task(url))
+
+    def _refresh_in_background(self, url: str):
+        if url in self._in_flight:
+            return
+
+        def report(task):
+            if not task.cancelled() and task.exception() is not None:
+                logger.error("Jikan refresh failed for %s", url, exc_info=task.exception())
+        self._fetch_task(url).add_done_callback(report)
+
+    async def _call_upstream(self, url: str) -> bytes:
+        wait = self.bucket.reserve(max_wait=self.timeout)
+        if wait is None:
+            raise JikanError(503, "Jikan rate limit reached")
+        if wait:
+            await asyncio.sleep(wait)
+        body = await run_in_threadpool(self._get, url)
+        self._cache.set(url, (time.monotonic(), body))
+        return body
+
+    def clear(self):
+        self._cache.clear()
+
+
+# One client (cache, rate limit) per worker process
+jikan = JikanClient(
+    base_url=settings.JIKAN_BASE_URL,
+    timeout=settings.JIKAN_TIMEOUT_SECONDS,
+    ttl=settings.JIKAN_CACHE_TTL_SECONDS,
+    stale=settings.JIKAN_STALE_SECONDS,
+    rate=settings.JIKAN_RATE_PER_SECOND,
+    burst=settings.JIKAN_RATE_BURST,
+    max_entries=settings.JIKAN_CACHE_MAX_ENTRIES,
+)
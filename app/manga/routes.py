@@ -1,55 +1,91 @@
 # app/manga/routes.py
-from fastapi import APIRouter, Request, Depends
-from fastapi.templating import Jinja2Templates
+from typing import Optional
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
+from fastapi.responses import Response
+from app.core.templating import templates
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_read_db, run_db
 from app.products.models import Product, Category
-from app.core.security import get_current_user_from_cookie
 from app.auth.models import User
+from app.dependencies import get_current_user
+from app.products.cache import get_recent_items, render_recent_strip
+from app.manga.jikan import jikan, JikanError
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
-# --- Helper to get user ---
-def get_user(request: Request, db: Session):
-    user_payload = get_current_user_from_cookie(request)
-    if user_payload:
-        return db.query(User).filter(User.email == user_payload["sub"]).first()
-    return None
+# --- Page Data (runs through run_db, sync or async session) ---
+def load_recent_manga_strip(db: Session):
+    return render_recent_strip(db, templates, "partials/recent_strip_covers.html", category_name="Manga")
+
+def load_physical_page(db: Session):
+    # Fetch only Manga products for sale
+    physical_manga = db.query(Product).join(Category).filter(Category.name == "Manga").all()
+
+    # Recent items for strip (shared cache)
+    recent_items = get_recent_items(db)
+    return physical_manga, recent_items
 
 # 1. MANGA LANDING ROUTE
 @router.get("/") # This becomes /manga/
-async def manga_landing(request: Request, db: Session = Depends(get_db)):
+async def manga_landing(request: Request, db: Session = Depends(get_read_db), user: User = Depends(get_current_user)):
     # Recent items specifically for the manga strip
-    recent_manga = db.query(Product).join(Category).filter(Category.name == "Manga").order_by(Product.created_at.desc()).limit(10).all()
+    recent_strip = await run_db(db, load_recent_manga_strip)
     
     return templates.TemplateResponse("manga/landing.html", {
         "request": request,
-        "recent_items": recent_manga,
-        "user": get_user(request, db)
+        "recent_strip": recent_strip,
+        "user": user
     })
 
 # 2. PHYSICAL MANGA SHOP ROUTE
 @router.get("/physical") # This becomes /manga/physical
-async def physical_manga(request: Request, db: Session = Depends(get_db)):
-    # Fetch only Manga products for sale
-    physical_manga = db.query(Product).join(Category).filter(Category.name == "Manga").all()
-    
-    # Recent items for strip
-    recent_items = db.query(Product).order_by(Product.created_at.desc()).limit(10).all()
+async def physical_manga(request: Request, db: Session = Depends(get_read_db), user: User = Depends(get_current_user)):
+    physical_manga, recent_items = await run_db(db, load_physical_page)
 
     return templates.TemplateResponse("manga/physical.html", {
         "request": request,
         "products": physical_manga,
         "recent_items": recent_items,
-        "user": get_user(request, db)
+        "user": user
     })
 
 # 3. E-BOOK / API ROUTE
 @router.get("/ebooks") # This becomes /manga/ebooks
-async def ebooks_page(request: Request, db: Session = Depends(get_db)):
+async def ebooks_page(request: Request, user: User = Depends(get_current_user)):
     # No DB query for products needed here, JS handles Jikan API
     return templates.TemplateResponse("manga/ebooks.html", {
         "request": request,
-        "user": get_user(request, db)
-    })
\ No newline at end of file
+        "user": user
+    })
+
+# 4. JIKAN PROXY (the e-book page calls these instead of api.jikan.moe)
+async def jikan_response(path: str, params: dict) -> Response:
+    try:
+        body, cache_status = await jikan.get(path, params)
+    except JikanError as exc:
+        raise HTTPException(status_code=exc.status, detail=exc.detail)
+    return Response(content=body, media_type="application/json", headers={
+        "Cache-Control": "public, max-age=60",
+        "X-Cache": cache_status,
+    })
+
+@router.get("/api/top") # /manga/api/top
+async def jikan_top_manga(
+    filter: str = Query("bypopularity", pattern="^(bypopularity|favorite|publishing|upcoming)$"),
+    limit: int = Query(20, ge=1, le=25),
+    page: int = Query(1, ge=1, le=100),
+):
+    return await jikan_response("top/manga", {"filter": filter, "limit": limit, "page": page})
+
+@router.get("/api/search") # /manga/api/search
+async def jikan_search_manga(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=25),
+    page: int = Query(1, ge=1, le=100),
+    sfw: Optional[bool] = None,
+):
+    # Normalised so "Naruto " and "naruto" share a cache entry
+    params = {"q": " ".join(q.lower().split()), "limit": limit, "page": page}
+    if sfw:
+        params["sfw"] = "true"
+    return await jikan_response("manga", params)
@@ -1,33 +1,34 @@
 # app/merch/routes.py
 from fastapi import APIRouter, Request, Depends
-from fastapi.templating import Jinja2Templates
+from app.core.templating import templates
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_read_db, run_db
 from app.products.models import Product, Category 
-from app.core.security import get_current_user_from_cookie
 from app.auth.models import User
+from app.dependencies import get_current_user
+from app.products.cache import render_recent_strip
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
-@router.get("/")  # This becomes /merch/
-async def merch_page(request: Request, db: Session = Depends(get_db)):
-    # 1. Fetch User (for navbar logic)
-    user = None
-    user_payload = get_current_user_from_cookie(request)
-    if user_payload:
-        user = db.query(User).filter(User.email == user_payload["sub"]).first()
-
-    # 2. Fetch Merchandise Products
+# --- Page Data (runs through run_db, sync or async session) ---
+def load_merch_page(db: Session):
     # Filter by category name "Merchandise"
     merch_products = db.query(Product).join(Category).filter(Category.name == "Merchandise").all()
-    
-    # 3. Fetch Recent items for the Gliding Strip (Last 10 items)
-    recent_items = db.query(Product).order_by(Product.created_at.desc()).limit(10).all()
+
+    # Gliding Strip (Last 10 items), shared and cached
+    recent_strip = render_recent_strip(db, templates, "partials/recent_strip.html")
+    return merch_products, recent_strip
+
+@router.get("/")  # This becomes /merch/
+async def merch_page(request: Request, db: Session = Depends(get_read_db), user: User = Depends(get_current_user)):
+    # 1. User (for navbar logic) comes from the shared dependency
+
+    # 2. Fetch Merchandise Products + Recent items for the Gliding Strip
+    merch_products, recent_strip = await run_db(db, load_merch_page)
 
     return templates.TemplateResponse("merch.html", {
         "request": request, 
         "products": merch_products,
-        "recent_items": recent_items,
+        "recent_strip": recent_strip,
         "user": user
     })
\ No newline at end of file
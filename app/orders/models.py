@@ -1,5 +1,5 @@
 # app/orders/models.py
-from sqlalchemy import Column, Integer, ForeignKey, Float, String, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, Float, String, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -12,6 +12,13 @@ class Order(Base):
     total_price = Column(Float)
     status = Column(String(50), default="Pending") # Pending, Paid, Shipped
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Denormalized at checkout so list views never touch order_items
+    item_count = Column(Integer, default=0)
+    summary = Column(String(255))  # e.g. "Naruto Vol. 1, Goku Figure +2 more"
+
+    # Order history is keyset-paginated per user on (created_at, id)
+    __table_args__ = (Index("ix_orders_user_created_id", "user_id", "created_at", "id"),)
     
     # Relationships
     user = relationship("app.auth.models.User")
@@ -0,0 +1,56 @@
+# app/orders/queries.py
+"""
+Order reads and helpers shared outside the orders router: the profile page
+lists recent orders and seed_synthetic.py writes the same summary column.
+"""
+from typing import Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, selectinload
+from app.core.config import settings
+from app.orders import models as order_models
+from app.products.models import Product
+from app.products.pagination import encode_cursor, decode_cursor
+
+# --- Short one-line description of an order for list views ---
+SUMMARY_TITLES = 2
+
+def order_summary(titles) -> str:
+    summary = ", ".join(titles[:SUMMARY_TITLES])
+    if len(titles) > SUMMARY_TITLES:
+        summary += f" +{len(titles) - SUMMARY_TITLES} more"
+    return summary[:255]
+
+# --- Orders with their items and products ---
+def load_user_orders(db: Session, user_id: int, cursor: Optional[str] = None,
+                     limit: Optional[int] = None, with_items: bool = True):
+    """
+    One page of a user's orders, newest first, keyset-paginated on
+    (created_at, id). Returns (orders, next_cursor). With with_items, each
+    order's items and product titles come in one batched query per page;
+    without, only the denormalized summary columns are available.
+    """
+    limit = limit or settings.ORDERS_PAGE_SIZE
+    Order = order_models.Order
+
+    query = db.query(Order).filter(Order.user_id == user_id)
+    if with_items:
+        query = query.options(
+            selectinload(Order.items)
+            .joinedload(order_models.OrderItem.product)
+            .load_only(Product.id, Product.title)
+        )
+    if cursor:
+        created_at, order_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Order.created_at < created_at,
+            and_(Order.created_at == created_at, Order.id < order_id),
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    orders = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1])
+    return orders, next_cursor
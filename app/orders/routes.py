@@ -1,35 +1,35 @@
 # app/orders/routes.py
 import uuid
+from typing import Optional
 from fastapi import APIRouter, Depends, status, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from app.core.templating import templates
+from sqlalchemy import insert, delete, update
 from sqlalchemy.orm import Session, joinedload
-from app.database import get_db
+from app.database import get_db, get_read_db, run_db
 from app.orders import models as order_models
+from app.orders.queries import load_user_orders, order_summary
 from app.cart import models as cart_models
+from app.cart.store import cart_store, load_cart_lines
+from app.products.models import Product
+from app.profile.rollups import record_sales
 from app.auth.models import User
-from app.core.security import get_current_user_from_cookie
+from app.dependencies import get_current_user
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 # --- 1. Checkout Page (Review Order) ---
 @router.get("/checkout", response_class=HTMLResponse)
-async def checkout_page(request: Request, db: Session = Depends(get_db)):
-    user_data = get_current_user_from_cookie(request)
-    if not user_data:
+async def checkout_page(request: Request, db: Session = Depends(get_read_db), user: User = Depends(get_current_user)):
+    if not user:
         return RedirectResponse(url="/auth/login", status_code=status.HTTP_303_SEE_OTHER)
 
-    user = db.query(User).filter(User.email == user_data["sub"]).first()
-    
-    # Get Cart
-    cart = db.query(cart_models.Cart).filter(cart_models.Cart.user_id == user.id).first()
-    if not cart or not cart.items:
+    # Same view of the cart as /cart (write-behind store included)
+    cart_items = await run_db(db, load_cart_lines, user.id)
+    if not cart_items:
         return RedirectResponse(url="/cart", status_code=status.HTTP_303_SEE_OTHER)
-    
+
     # Calculate Total
-    cart_items = db.query(cart_models.CartItem).options(joinedload(cart_models.CartItem.product))\
-        .filter(cart_models.CartItem.cart_id == cart.id).all()
     total_price = sum(item.product.price * item.quantity for item in cart_items)
 
     return templates.TemplateResponse("checkout.html", {
@@ -39,57 +39,120 @@ async def checkout_page(request: Request, db: Session = Depends(get_db)):
         "user": user  # Context passed correctly here
     })
 
-# --- 2. Place Order (The Real Work) ---
-@router.post("/place-order")
-async def place_order(request: Request, db: Session = Depends(get_db)):
-    user_data = get_current_user_from_cookie(request)
-    if not user_data:
-        return RedirectResponse(url="/auth/login", status_code=status.HTTP_303_SEE_OTHER)
-    
-    user = db.query(User).filter(User.email == user_data["sub"]).first()
-    cart = db.query(cart_models.Cart).filter(cart_models.Cart.user_id == user.id).first()
-    cart_items = db.query(cart_models.CartItem).filter(cart_models.CartItem.cart_id == cart.id).all()
+class OutOfStockError(Exception):
+    def __init__(self, product):
+        super().__init__(f"Not enough stock for product {product.id}")
+        self.product = product
 
+# --- Helper: Reserve stock without overselling ---
+def reserve_stock(db: Session, cart_items):
+    """
+    Decrements stock with one conditional UPDATE per product, so two buyers
+    racing for the last unit can never both win. Products are updated in id
+    order so concurrent checkouts lock rows in the same order (no deadlocks).
+    Raises OutOfStockError on the first product that cannot cover the cart.
+    """
+    wanted = {}
+    for item in cart_items:
+        wanted[item.product_id] = wanted.get(item.product_id, 0) + item.quantity
+    products = {item.product_id: item.product for item in cart_items}
+
+    for product_id in sorted(wanted):
+        quantity = wanted[product_id]
+        result = db.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.stock >= quantity)
+            .values(stock=Product.stock - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            raise OutOfStockError(products[product_id])
+
+# --- Helper: Turn the user's cart into an order (one transaction) ---
+def create_order_from_cart(db: Session, user_id: int):
+    """
+    Reserves stock, writes the order, its items and empties the cart in a
+    single commit. Returns (new order, {product_id: quantity ordered}), or
+    (None, {}) if the cart is empty. If any product is short, nothing is
+    written and OutOfStockError is raised.
+    """
+    # One query: the user's cart items together with their products
+    cart_items = db.query(cart_models.CartItem)\
+        .join(cart_models.Cart).filter(cart_models.Cart.user_id == user_id)\
+        .options(joinedload(cart_models.CartItem.product)).all()
+    cart_items = [item for item in cart_items if item.product is not None]
     if not cart_items:
-        return RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
+        return None, {}
+
+    try:
+        reserve_stock(db, cart_items)
+    except OutOfStockError:
+        db.rollback()
+        raise
 
-    # A. Create Order
+    # A. Create Order (flush assigns the id without committing)
     total_price = sum(item.product.price * item.quantity for item in cart_items)
     new_order = order_models.Order(
-        user_id=user.id,
+        user_id=user_id,
         total_price=total_price,
-        status="Pending (Cash on Delivery)"
+        status="Pending (Cash on Delivery)",
+        item_count=sum(item.quantity for item in cart_items),
+        summary=order_summary([item.product.title for item in cart_items]),
     )
     db.add(new_order)
-    db.commit()
-    db.refresh(new_order)
+    db.flush()
+
+    # B. Move Items from Cart -> OrderItems (one executemany)
+    db.execute(insert(order_models.OrderItem), [
+        {
+            "order_id": new_order.id,
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "price": item.product.price,
+        }
+        for item in cart_items
+    ])
+
+    # C. Remove exactly those rows from the Cart (one DELETE)
+    db.execute(delete(cart_models.CartItem).where(cart_models.CartItem.id.in_([item.id for item in cart_items])))
+
+    # D. Seller dashboard rollups move with the order
+    record_sales(db, new_order.created_at.date(), [
+        (item.product.seller_id, item.product_id, item.quantity, item.product.price)
+        for item in cart_items
+    ])
 
-    # B. Move Items from Cart -> OrderItems
-    for item in cart_items:
-        order_item = order_models.OrderItem(
-            order_id=new_order.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=item.product.price
-        )
-        db.add(order_item)
-        
-        # C. Remove from Cart
-        db.delete(item)
-    
     db.commit()
+    ordered = {}
+    for item in cart_items:
+        ordered[item.product_id] = ordered.get(item.product_id, 0) + item.quantity
+    return new_order, ordered
+
+# --- 2. Place Order (The Real Work) ---
+@router.post("/place-order")
+def place_order(request: Request, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    if not user:
+        return RedirectResponse(url="/auth/login", status_code=status.HTTP_303_SEE_OTHER)
+
+    # Orders are placed from cart_items, so write out any pending cart changes first
+    cart_store.flush_user(user.id)
+    try:
+        order, ordered = create_order_from_cart(db, user.id)
+    except OutOfStockError as exc:
+        return RedirectResponse(url=f"/cart?error=out_of_stock&product_id={exc.product.id}",
+                                status_code=status.HTTP_303_SEE_OTHER)
+    if order is None:
+        return RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
+    # Only what was ordered: a click that landed after the flush stays in the cart
+    cart_store.clear(user.id, ordered)
 
     return RedirectResponse(url="/orders/success", status_code=status.HTTP_303_SEE_OTHER)
 
 # --- 3. Order Success Page ---
 @router.get("/success", response_class=HTMLResponse)
-async def order_success(request: Request, db: Session = Depends(get_db)):
-    # 1. Fetch User (Fixes the Login Button issue)
-    user_data = get_current_user_from_cookie(request)
-    user = None
-    if user_data:
-        user = db.query(User).filter(User.email == user_data["sub"]).first()
-    
+async def order_success(request: Request, user: User = Depends(get_current_user)):
+    # 1. User comes from the shared dependency (Fixes the Login Button issue)
+
     # 2. Generate Transaction ID (Fixes 'int has no len' error)
     transaction_id = str(uuid.uuid4()).split('-')[0].upper()
 
@@ -101,19 +164,17 @@ async def order_success(request: Request, db: Session = Depends(get_db)):
 
 # --- 4. My Orders History ---
 @router.get("/my-orders", response_class=HTMLResponse)
-async def my_orders(request: Request, db: Session = Depends(get_db)):
-    user_data = get_current_user_from_cookie(request)
-    if not user_data:
+async def my_orders(request: Request, cursor: Optional[str] = None, db: Session = Depends(get_read_db),
+                    user: User = Depends(get_current_user)):
+    if not user:
         return RedirectResponse(url="/auth/login", status_code=status.HTTP_303_SEE_OTHER)
     
-    user = db.query(User).filter(User.email == user_data["sub"]).first()
-    
-    # Fetch orders ordered by newest first
-    orders = db.query(order_models.Order).filter(order_models.Order.user_id == user.id)\
-        .order_by(order_models.Order.created_at.desc()).all()
+    orders, next_cursor = await run_db(db, load_user_orders, user.id, cursor)
         
     return templates.TemplateResponse("my_orders.html", {
         "request": request, 
         "orders": orders,
+        "next_cursor": next_cursor,
+        "is_first_page": cursor is None,
         "user": user # <--- Passing this ensures Navbar works
     })
\ No newline at end of file
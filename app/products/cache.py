@@ -0,0 +1,63 @@
+# app/products/cache.py
+import threading
+from markupsafe import Markup
+from sqlalchemy.orm import Session, joinedload
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.page_cache import page_cache
+from app.products import schemas
+from app.products.models import Product, Category
+
+# The "recent items" gliding strip is the same for every visitor, so it is
+# computed once (as data and as rendered HTML) and shared until the catalog
+# changes. invalidate_catalog_caches() clears it in this worker; other
+# workers pick up the change when RECENT_ITEMS_TTL_SECONDS runs out.
+RECENT_ITEMS_LIMIT = 10
+
+# category name (None = whole catalog) -> tuple of CatalogItem snapshots
+recent_items_cache = TTLCache(maxsize=64, ttl=settings.RECENT_ITEMS_TTL_SECONDS)
+# (template name, category name) -> rendered Markup
+recent_strip_cache = TTLCache(maxsize=64, ttl=settings.RECENT_ITEMS_TTL_SECONDS)
+
+# Bumped on every invalidation so a reader that started before a write
+# does not put its (now stale) result back into the cache
+_generation = 0
+_generation_lock = threading.Lock()
+
+def invalidate_catalog_caches():
+    """Call after any product is created or deleted. The page cache is cleared in every worker."""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        recent_items_cache.clear()
+        recent_strip_cache.clear()
+    page_cache.clear()
+
+def _store(cache: TTLCache, key, value, generation: int):
+    with _generation_lock:
+        if generation == _generation:
+            cache.set(key, value)
+
+def get_recent_items(db: Session, category_name: str = None):
+    """Newest products (optionally of one category), as detached snapshots safe to share between requests."""
+    items = recent_items_cache.get(category_name)
+    if items is None:
+        generation = _generation
+        query = db.query(Product).options(joinedload(Product.category))
+        if category_name:
+            query = query.join(Category).filter(Category.name == category_name)
+        products = query.order_by(Product.created_at.desc(), Product.id.desc()).limit(RECENT_ITEMS_LIMIT).all()
+        items = tuple(schemas.CatalogItem.model_validate(p) for p in products)
+        _store(recent_items_cache, category_name, items, generation)
+    return items
+
+def render_recent_strip(db: Session, templates, template_name: str, category_name: str = None) -> Markup:
+    """The strip as ready-to-embed HTML, rendered once per (template, category)."""
+    key = (template_name, category_name)
+    html = recent_strip_cache.get(key)
+    if html is None:
+        generation = _generation
+        items = get_recent_items(db, category_name)
+        html = Markup(templates.get_template(template_name).render(recent_items=items))
+        _store(recent_strip_cache, key, html, generation)
+    return html
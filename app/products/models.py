@@ -1,6 +1,7 @@
 # app/products/models.py
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, DateTime, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects import sqlite
 from app.database import Base
 from sqlalchemy.sql import func
 
@@ -23,11 +24,24 @@ class Product(Base):
     description = Column(Text)
     price = Column(Float)
     image_url = Column(String(255)) # We will store the file path here
-    created_at = Column(DateTime(timezone=True), server_default=func.now()) 
+    # SQLite's CURRENT_TIMESTAMP has no microseconds; bind values the same way
+    # so keyset cursors compare equal to the stored text
+    created_at = Column(
+        DateTime(timezone=True).with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite"),
+        server_default=func.now(),
+    )
     stock = Column(Integer, default=1)
     category = relationship("Category", back_populates="products")
     seller = relationship("app.auth.models.User")
 
+    # Serves the keyset pagination on the catalog (newest first)
+    __table_args__ = (
+        Index("ix_products_created_at_id", "created_at", "id"),
+    )
+
+    @property
+    def category_name(self):
+        return self.category.name if self.category else None
 
 
 
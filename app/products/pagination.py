@@ -0,0 +1,63 @@
+# app/products/pagination.py
+import base64
+import binascii
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, joinedload
+from app.core.config import settings
+from app.products.models import Product, Category
+
+# Catalog pages are keyset-paginated on (created_at, id), newest first.
+# The cursor is the position of the last product on the previous page, so
+# fetching page N costs the same as fetching page 1 (no OFFSET scan).
+
+def encode_cursor(product: Product) -> str:
+    raw = f"{product.created_at.isoformat()}|{product.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, _, product_id = base64.urlsafe_b64decode(padded).decode().partition("|")
+        return datetime.fromisoformat(created_at), int(product_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    if not limit:
+        return settings.CATALOG_PAGE_SIZE
+    return max(1, min(limit, settings.CATALOG_MAX_PAGE_SIZE))
+
+def get_catalog_page(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    category_name: Optional[str] = None,
+) -> Tuple[List[Product], Optional[str]]:
+    """
+    Returns one page of products (with their category already loaded)
+    and the cursor for the next page, or None on the last page.
+    """
+    limit = clamp_page_size(limit)
+
+    query = db.query(Product).options(joinedload(Product.category))
+    if category_name:
+        query = query.filter(Product.category.has(Category.name == category_name))
+
+    if cursor:
+        created_at, product_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Product.created_at < created_at,
+            and_(Product.created_at == created_at, Product.id < product_id),
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    products = query.order_by(Product.created_at.desc(), Product.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        next_cursor = encode_cursor(products[-1])
+    return products, next_cursor
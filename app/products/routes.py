@@ -1,23 +1,22 @@
 # app/products/routes.py
-import shutil
-import os
+from typing import Optional
 from fastapi import APIRouter, Depends, File, UploadFile, Form, Request, status, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.products import models
+from app.core.templating import templates
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, joinedload
+from app.database import get_db, get_read_db, run_db
+from app.products import models, schemas
+from app.products.pagination import get_catalog_page, clamp_page_size
+from app.products.search import search_index
+from app.products.cache import invalidate_catalog_caches
 from app.auth.models import User
-from app.core.security import get_current_user_from_cookie # We will add this helper next
+from app.dependencies import get_current_user
+from app.utils import save_upload_file
 from fastapi import HTTPException
 
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
-
-# Ensure image directory exists
-UPLOAD_DIR = "app/static/images"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 # --- Render "Add Product" Page ---
 # @router.get("/add", response_class=HTMLResponse)
@@ -40,6 +39,23 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
 
+# --- Helper: Insert Product (sync, called through the threadpool) ---
+def create_product_row(db: Session, seller_id: int, category_name: str, **fields):
+    category = db.query(models.Category).filter(models.Category.name == category_name).first()
+    if not category:
+        category = models.Category(name=category_name)
+        db.add(category)
+        db.commit()
+        db.refresh(category)
+
+    new_product = models.Product(category_id=category.id, seller_id=seller_id, **fields)
+    db.add(new_product)
+    db.commit()
+    db.refresh(new_product)
+    search_index.add_product(new_product)
+    invalidate_catalog_caches()
+    return new_product
+
 # --- Handle Product Creation ---
 @router.post("/add")
 async def create_product(
@@ -50,55 +66,89 @@ async def create_product(
     category_name: str = Form(...),
     image: UploadFile = File(...),
     db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
 ):
-    user_payload = get_current_user_from_cookie(request)
-    if not user_payload:
+    if not user:
         return RedirectResponse(url="/auth/login", status_code=status.HTTP_303_SEE_OTHER)
     
-    user = db.query(User).filter(User.email == user_payload["sub"]).first()
-    
     # SECURITY CHECK: Block if not a seller
     if user.role != "seller":
         raise HTTPException(status_code=403, detail="Only sellers can add products")
 
-    # ... rest of the code (image saving, etc) remains the same ...
-    # (Copy the previous logic here for saving image and product)
-    file_location = f"{UPLOAD_DIR}/{image.filename}"
-    with open(file_location, "wb") as buffer:
-        shutil.copyfileobj(image.file, buffer)
-    
-    category = db.query(models.Category).filter(models.Category.name == category_name).first()
-    if not category:
-        category = models.Category(name=category_name)
-        db.add(category)
-        db.commit()
-        db.refresh(category)
+    image_url = await save_upload_file(image)
 
-    new_product = models.Product(
+    await run_in_threadpool(
+        create_product_row, db, user.id, category_name,
         title=title,
         description=description,
         price=price,
-        category_id=category.id,
-        seller_id=user.id, 
-        image_url=f"/static/images/{image.filename}"
+        image_url=image_url,
     )
-    db.add(new_product)
-    db.commit()
 
     return RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
 
 
 
+# --- Catalog API (keyset paginated) ---
+@router.get("/api/catalog", response_model=schemas.CatalogPage)
+def catalog_page(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    category: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    products, next_cursor = get_catalog_page(db, cursor=cursor, limit=limit, category_name=category)
+    return schemas.CatalogPage(
+        items=[schemas.CatalogItem.model_validate(p) for p in products],
+        next_cursor=next_cursor,
+    )
+
+
+# --- Full-text Search (in-memory index) ---
+# Declared before /{product_id} so "search" is not parsed as an id
+@router.get("/search", response_model=schemas.SearchPage)
+def search_products(
+    q: str = "",
+    page: int = 1,
+    limit: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    if not search_index.ready.is_set():
+        raise HTTPException(status_code=503, detail="Search is starting up, try again shortly",
+                            headers={"Retry-After": "1"})
+    page = max(page, 1)
+    limit = clamp_page_size(limit)
+    hits, total = search_index.search(q, offset=(page - 1) * limit, limit=limit)
+
+    # One query for the whole page, then put the rows back in rank order
+    ids = [product_id for product_id, _ in hits]
+    products = db.query(models.Product).options(joinedload(models.Product.category))\
+        .filter(models.Product.id.in_(ids)).all() if ids else []
+    by_id = {p.id: p for p in products}
+
+    items = [
+        schemas.SearchHit(**schemas.CatalogItem.model_validate(by_id[product_id]).model_dump(), score=round(score, 4))
+        for product_id, score in hits if product_id in by_id
+    ]
+    return schemas.SearchPage(query=q, total=total, page=page, items=items)
+
+
+# --- Helper: Product + everything the detail page shows ---
+def load_product_detail(db: Session, product_id: int):
+    return db.query(models.Product)\
+        .options(joinedload(models.Product.category), joinedload(models.Product.seller))\
+        .filter(models.Product.id == product_id).first()
+
+
 # app/products/routes.py -> product_detail function
 @router.get("/{product_id}", response_class=HTMLResponse)
-async def product_detail(request: Request, product_id: int, db: Session = Depends(get_db)):
-    product = db.query(models.Product).filter(models.Product.id == product_id).first()
-    
-    # Get current user
-    user = None
-    user_payload = get_current_user_from_cookie(request)
-    if user_payload:
-        user = db.query(User).filter(User.email == user_payload["sub"]).first()
+async def product_detail(
+    request: Request,
+    product_id: int,
+    db: Session = Depends(get_read_db),
+    user: User = Depends(get_current_user),
+):
+    product = await run_db(db, load_product_detail, product_id)
 
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
@@ -1,6 +1,6 @@
 # app/products/schemas.py
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class ProductCreate(BaseModel):
     title: str
@@ -15,4 +15,21 @@ class ProductOut(BaseModel):
     image_url: str
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CatalogItem(ProductOut):
+    image_url: Optional[str] = None
+    category_name: Optional[str] = None
+
+class CatalogPage(BaseModel):
+    items: List[CatalogItem]
+    next_cursor: Optional[str] = None
+
+class SearchHit(CatalogItem):
+    score: float
+
+class SearchPage(BaseModel):
+    query: str
+    total: int
+    page: int
+    items: List[SearchHit]
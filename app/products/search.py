@@ -0,0 +1,240 @@
+# app/products/search.py
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from sqlalchemy.orm import Session, joinedload
+from app.products.models import Product
+
+TOKEN_RE = re.compile(r"\w+")
+
+logger = logging.getLogger(__name__)
+
+# A hit in the title is worth more than one in the category name,
+# which is worth more than one in the description
+FIELD_WEIGHTS = (
+    ("title", 3.0),
+    ("category_name", 2.0),
+    ("description", 1.0),
+)
+
+# BM25 tuning (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+def tokenize(text) -> List[str]:
+    if not text:
+        return []
+    return TOKEN_RE.findall(text.lower())
+
+def _weighted_terms(product: Product) -> Dict[str, float]:
+    terms: Dict[str, float] = defaultdict(float)
+    for field, weight in FIELD_WEIGHTS:
+        for token in tokenize(getattr(product, field)):
+            terms[token] += weight
+    return terms
+
+
+class SearchIndex:
+    """
+    In-memory inverted index over product title, description and category name.
+    Built once per worker at startup (or in the background, see
+    SEARCH_INDEX_IN_BACKGROUND), then kept current by the routes that
+    create or delete products. Products written through other workers are
+    picked up by refresh() and the periodic rebuild (start()). Reads and
+    writes are guarded by one lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._total_length = 0.0
+        # Set once the first build() finished; until then search results would be incomplete
+        self.ready = threading.Event()
+        self._changes = None  # (product_id, terms or None) written while build() runs
+        # Highest product id seen by build()/refresh(). Local adds don't move it,
+        # so a lower id created by another worker meanwhile is still picked up.
+        self._max_scanned_id = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    # --- Writes ---
+    def build(self, db: Session, batch_size: int = 1000):
+        """
+        Rebuilds the whole index from the products table. Products added or
+        removed while it runs (it may run in a background thread) are
+        replayed onto the new index before it is swapped in.
+        """
+        postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        doc_terms: Dict[int, Dict[str, float]] = {}
+        doc_lengths: Dict[int, float] = {}
+        max_id = 0
+        with self._lock:
+            self._changes = []
+
+        try:
+            query = db.query(Product).options(joinedload(Product.category)).yield_per(batch_size)
+            for product in query:
+                terms = _weighted_terms(product)
+                doc_terms[product.id] = terms
+                doc_lengths[product.id] = sum(terms.values())
+                max_id = max(max_id, product.id)
+                for term, tf in terms.items():
+                    postings[term][product.id] = tf
+
+            # Swap in the finished index so searches never see a half-built one
+            with self._lock:
+                self._postings = dict(postings)
+                self._doc_terms = doc_terms
+                self._doc_lengths = doc_lengths
+                self._total_length = sum(doc_lengths.values())
+                self._max_scanned_id = max_id
+                for product_id, terms in self._changes:
+                    self._remove(product_id)
+                    if terms is not None:
+                        self._add(product_id, terms)
+        finally:
+            with self._lock:
+                self._changes = None
+        self.ready.set()
+
+    def refresh(self, db: Session, batch_size: int = 1000) -> int:
+        """Indexes products with an id above any scanned so far. Returns how many were found."""
+        with self._lock:
+            last_id = self._max_scanned_id
+        query = db.query(Product).options(joinedload(Product.category))\
+            .filter(Product.id > last_id).order_by(Product.id).yield_per(batch_size)
+        found = 0
+        for product in query:
+            self.add_product(product)
+            found += 1
+            with self._lock:
+                self._max_scanned_id = max(self._max_scanned_id, product.id)
+        return found
+
+    def add_product(self, product: Product):
+        """Indexes a new product, or re-indexes an edited one."""
+        terms = _weighted_terms(product)
+        with self._lock:
+            self._remove(product.id)
+            self._add(product.id, terms)
+            if self._changes is not None:
+                self._changes.append((product.id, terms))
+
+    def remove_product(self, product_id: int):
+        with self._lock:
+            self._remove(product_id)
+            if self._changes is not None:
+                self._changes.append((product_id, None))
+
+    def _add(self, product_id: int, terms: Dict[str, float]):
+        self._doc_terms[product_id] = terms
+        self._doc_lengths[product_id] = sum(terms.values())
+        self._total_length += self._doc_lengths[product_id]
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[product_id] = tf
+
+    def _remove(self, product_id: int):
+        terms = self._doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(product_id)
+        for term in terms:
+            docs = self._postings.get(term)
+            if docs is not None:
+                docs.pop(product_id, None)
+                if not docs:
+                    del self._postings[term]
+
+    # --- Keeping up with other workers ---
+    def _run(self, session_factory, refresh_seconds: float, rebuild_seconds: float):
+        # First build, when the worker didn't wait for it: retried with backoff until it works
+        delay = 1.0
+        while not self.ready.is_set():
+            if self._in_session(session_factory, self.build, "Search index build failed, retrying"):
+                break
+            if self._stop.wait(delay):
+                return
+            delay = min(delay * 2, 60.0)
+
+        if refresh_seconds <= 0 and rebuild_seconds <= 0:
+            return
+        last_build = time.monotonic()
+        tick = min(seconds for seconds in (refresh_seconds, rebuild_seconds) if seconds > 0)
+        while not self._stop.wait(tick):
+            if rebuild_seconds > 0 and time.monotonic() - last_build >= rebuild_seconds:
+                if self._in_session(session_factory, self.build, "Search index rebuild failed, will retry"):
+                    last_build = time.monotonic()
+            elif refresh_seconds > 0:
+                self._in_session(session_factory, self.refresh, "Search index refresh failed, will retry")
+
+    @staticmethod
+    def _in_session(session_factory, step, failure: str) -> bool:
+        db = session_factory()
+        try:
+            step(db)
+            return True
+        except Exception:
+            logger.exception(failure)
+            return False
+        finally:
+            db.close()
+
+    def start(self, session_factory, refresh_seconds: float, rebuild_seconds: float):
+        """
+        Background thread that builds the index if build() hasn't run yet
+        (SEARCH_INDEX_IN_BACKGROUND), then refreshes and rebuilds it.
+        """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(session_factory, refresh_seconds, rebuild_seconds),
+                                            name="search-index", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    # --- Reads ---
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[List[Tuple[int, float]], int]:
+        """
+        Returns ([(product_id, score), ...] for the requested slice, total matches),
+        best match first (ties broken by newest id).
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return [], 0
+
+        with self._lock:
+            doc_count = len(self._doc_terms)
+            if not doc_count:
+                return [], 0
+            avg_length = self._total_length / doc_count
+
+            scores: Dict[int, float] = defaultdict(float)
+            for term in terms:
+                docs = self._postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for product_id, tf in docs.items():
+                    norm = K1 * (1 - B + B * self._doc_lengths[product_id] / avg_length)
+                    scores[product_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(offset + limit, scores.items(), key=lambda hit: (hit[1], hit[0]))
+        return top[offset:], len(scores)
+
+
+# One index per worker process
+search_index = SearchIndex()
@@ -0,0 +1,37 @@
+# app/profile/models.py
+from sqlalchemy import Column, Integer, Float, Date, Index
+from app.database import Base
+
+# Seller sales rollups, kept current by place_order (see app/profile/rollups.py)
+# and rebuilt from order_items with `python -m app.profile.rollups`.
+# "lines" counts order_items rows, "units" sums their quantities.
+# Derived data, so no foreign keys: rollup writes take no locks on users/products.
+
+class SellerSales(Base):
+    __tablename__ = "seller_sales"
+
+    seller_id = Column(Integer, primary_key=True)
+    lines = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+class ProductSales(Base):
+    __tablename__ = "product_sales"
+
+    product_id = Column(Integer, primary_key=True)
+    seller_id = Column(Integer)
+    lines = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+    # Serves a seller's top sellers (index range scan, no sort)
+    __table_args__ = (Index("ix_product_sales_seller_units", "seller_id", "units"),)
+
+class SellerDailySales(Base):
+    __tablename__ = "seller_daily_sales"
+
+    seller_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC, like orders.created_at
+    lines = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
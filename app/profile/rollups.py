@@ -0,0 +1,123 @@
+# app/profile/rollups.py
+"""
+Seller sales rollups behind the profile dashboard.
+
+place_order calls record_sales() inside the order transaction, so the totals
+move together with order_items. To backfill (or repair) them from scratch:
+
+    python -m app.profile.rollups
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.core.utils import upsert
+from app.database import Base, engine, SessionLocal
+from app.orders.models import Order, OrderItem
+from app.products.models import Product
+from app.profile.models import SellerSales, ProductSales, SellerDailySales
+
+TOTALS = ("lines", "units", "revenue")
+ROLLUP_TABLES = [SellerSales.__table__, ProductSales.__table__, SellerDailySales.__table__]
+
+
+def record_sales(db: Session, day: date, lines: Iterable[Tuple[Optional[int], int, int, float]]):
+    """
+    Adds sold order lines, given as (seller_id, product_id, quantity, price),
+    to the rollups: one upsert per table, in the caller's transaction.
+    """
+    sellers = defaultdict(lambda: [0, 0, 0.0])
+    products = defaultdict(lambda: [0, 0, 0.0])
+    for seller_id, product_id, quantity, price in lines:
+        if seller_id is None:
+            continue
+        for totals in (sellers[seller_id], products[(product_id, seller_id)]):
+            totals[0] += 1
+            totals[1] += quantity
+            totals[2] += quantity * price
+
+    # Sorted keys, so concurrent checkouts lock rollup rows in the same order
+    upsert(db, SellerSales, [
+        {"seller_id": seller_id, **dict(zip(TOTALS, totals))}
+        for seller_id, totals in sorted(sellers.items())
+    ], keys=("seller_id",), increment=TOTALS)
+    upsert(db, SellerDailySales, [
+        {"seller_id": seller_id, "day": day, **dict(zip(TOTALS, totals))}
+        for seller_id, totals in sorted(sellers.items())
+    ], keys=("seller_id", "day"), increment=TOTALS)
+    upsert(db, ProductSales, [
+        {"product_id": product_id, "seller_id": seller_id, **dict(zip(TOTALS, totals))}
+        for (product_id, seller_id), totals in sorted(products.items())
+    ], keys=("product_id",), increment=TOTALS)
+
+
+def get_seller_summary(db: Session, seller_id: int, top: int = 3, days: int = 30) -> dict:
+    """Dashboard numbers for one seller. Cost does not depend on how much they sold."""
+    totals = db.get(SellerSales, seller_id)
+
+    top_items = db.query(Product.title, ProductSales.units.label("sold_count"))\
+        .join(Product, Product.id == ProductSales.product_id)\
+        .filter(ProductSales.seller_id == seller_id)\
+        .order_by(ProductSales.units.desc()).limit(top).all()
+
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    recent_revenue = db.query(func.coalesce(func.sum(SellerDailySales.revenue), 0.0))\
+        .filter(SellerDailySales.seller_id == seller_id, SellerDailySales.day >= since).scalar()
+
+    return {
+        "total_sales": totals.lines if totals else 0,
+        "revenue": totals.revenue if totals else 0.0,
+        "recent_revenue": recent_revenue,
+        "top_items": top_items,
+    }
+
+
+def rebuild(db: Session) -> int:
+    """Recomputes every rollup from order_items in one transaction. Returns the seller count."""
+    lines = func.count(OrderItem.id)
+    units = func.coalesce(func.sum(OrderItem.quantity), 0)
+    revenue = func.coalesce(func.sum(OrderItem.price * OrderItem.quantity), 0.0)
+    sold = select().select_from(OrderItem).join(Product, Product.id == OrderItem.product_id)\
+        .where(Product.seller_id.is_not(None))
+    day = func.date(Order.created_at)
+
+    for model in (SellerSales, ProductSales, SellerDailySales):
+        db.execute(delete(model))
+
+    db.execute(insert(SellerSales).from_select(
+        ["seller_id", *TOTALS],
+        sold.add_columns(Product.seller_id, lines, units, revenue).group_by(Product.seller_id),
+    ))
+    db.execute(insert(ProductSales).from_select(
+        ["product_id", "seller_id", *TOTALS],
+        sold.add_columns(Product.id, Product.seller_id, lines, units, revenue).group_by(Product.id, Product.seller_id),
+    ))
+    db.execute(insert(SellerDailySales).from_select(
+        ["seller_id", "day", *TOTALS],
+        sold.join(Order, Order.id == OrderItem.order_id)
+            .add_columns(Product.seller_id, day, lines, units, revenue).group_by(Product.seller_id, day),
+    ))
+    db.commit()
+    return db.query(func.count()).select_from(SellerSales).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the seller sales rollups from order_items.")
+    parser.parse_args()
+
+    # Running standalone: register the models the relationships point at
+    import app.auth.models, app.cart.models  # noqa: F401
+
+    Base.metadata.create_all(bind=engine, tables=ROLLUP_TABLES)
+    db = SessionLocal()
+    try:
+        sellers = rebuild(db)
+    finally:
+        db.close()
+    print(f"Rebuilt sales rollups for {sellers} sellers")
+
+
+if __name__ == "__main__":
+    main()
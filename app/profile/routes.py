@@ -1,64 +1,48 @@
 # app/profile/routes.py
-import os
-import shutil
 from fastapi import APIRouter, Depends, Request, UploadFile, File, Form, status
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from app.core.templating import templates
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, desc
 from app.database import get_db
 from app.auth.models import User
 from app.products.models import Product
-from app.orders.models import OrderItem, Order
-from app.core.security import get_current_user_from_cookie
+from app.orders.queries import load_user_orders
+from app.profile.rollups import get_seller_summary
+from app.dependencies import get_current_user, invalidate_user
 from app.utils import save_upload_file
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
-UPLOAD_DIR = "app/static/profiles"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 @router.get("/", response_class=HTMLResponse)
-async def profile_dashboard(request: Request, db: Session = Depends(get_db)):
-    user_payload = get_current_user_from_cookie(request)
-    if not user_payload:
+def profile_dashboard(request: Request, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    if not user:
         return RedirectResponse(url="/auth/login", status_code=status.HTTP_303_SEE_OTHER)
 
-    user = db.query(User).filter(User.email == user_payload["sub"]).first()
-
     # --- LOGIC BRANCHING ---
     
     if user.role == "seller":
         # 1. Get Listed Items
-        products = db.query(Product).filter(Product.seller_id == user.id).all()
-        
-        # 2. Get Sales History (Items belonging to seller that were ordered)
-        sales_query = db.query(OrderItem).join(Product).filter(Product.seller_id == user.id)
-        total_sales_count = sales_query.count()
-        total_revenue = db.query(func.sum(OrderItem.price * OrderItem.quantity)).join(Product).filter(Product.seller_id == user.id).scalar() or 0.0
-        
-        # 3. Get Top Selling Items
-        # (Group by product ID, count occurrences, order by desc)
-        top_items = db.query(
-            Product.title, 
-            func.sum(OrderItem.quantity).label('sold_count')
-        ).join(OrderItem).filter(Product.seller_id == user.id)\
-         .group_by(Product.id).order_by(desc('sold_count')).limit(3).all()
+        products = db.query(Product).options(joinedload(Product.category))\
+            .filter(Product.seller_id == user.id).all()
+
+        # 2. Sales totals, last 30 days and top sellers (precomputed rollups)
+        sales = get_seller_summary(db, user.id)
 
         return templates.TemplateResponse("profile/seller.html", {
             "request": request,
             "user": user,
             "products": products,
-            "total_sales": total_sales_count,
-            "revenue": total_revenue,
-            "top_items": top_items
+            "total_sales": sales["total_sales"],
+            "revenue": sales["revenue"],
+            "recent_revenue": sales["recent_revenue"],
+            "top_items": sales["top_items"]
         })
 
     else:
         # BUYER LOGIC
         # 1. Get Buying History (Recent 5 orders)
-        recent_orders = db.query(Order).filter(Order.user_id == user.id)\
-            .order_by(Order.created_at.desc()).limit(5).all()
+        recent_orders, _ = load_user_orders(db, user.id, limit=5, with_items=False)
 
         return templates.TemplateResponse("profile/buyer.html", {
             "request": request,
@@ -66,28 +50,35 @@ async def profile_dashboard(request: Request, db: Session = Depends(get_db)):
             "recent_orders": recent_orders
         })
 
+# --- Helper: Save Profile Changes (sync, called through the threadpool) ---
+def apply_profile_update(db: Session, user_id: int, username: str, avatar_url: str = None):
+    # The cached user is detached; load the row into this session to edit it
+    user = db.get(User, user_id)
+    if user:
+        user.username = username
+        if avatar_url:
+            user.avatar_url = avatar_url
+        db.commit()
+    return user
+
 # --- 2. UPDATE PROFILE ROUTE ---
 @router.post("/update")
 async def update_profile(
     request: Request,
     username: str = Form(...),
     avatar_file: UploadFile = File(None),  # Expect a file, default to None
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
 ):
-    user_payload = get_current_user_from_cookie(request)
-    if not user_payload:
+    if not current_user:
         return RedirectResponse(url="/auth/login", status_code=302)
 
-    user = db.query(User).filter(User.email == user_payload["sub"]).first()
-    
-    if user:
-        user.username = username
-        
-        # Only update avatar if a new file was actually uploaded
-        if avatar_file and avatar_file.filename:
-            image_url = await save_upload_file(avatar_file)
-            user.avatar_url = image_url
-            
-        db.commit()
+    # Only update avatar if a new file was actually uploaded
+    image_url = None
+    if avatar_file and avatar_file.filename:
+        image_url = await save_upload_file(avatar_file)
+
+    await run_in_threadpool(apply_profile_update, db, current_user.id, username, image_url)
+    invalidate_user(current_user.email)
     
     return RedirectResponse(url="/profile", status_code=303)
\ No newline at end of file
@@ -0,0 +1,21 @@
+// Theme for the Tailwind CDN build; loaded right after its <script> tag
+tailwind.config = {
+    theme: {
+        extend: {
+            colors: {
+                'anime-dark': '#0f0f1a',
+                'anime-card': '#1a1a2e',
+                'neon-pink': '#ff00ff',
+                'neon-blue': '#00f3ff',
+                'neon-purple': '#bc13fe',
+            },
+            fontFamily: {
+                sans: ['Inter', 'sans-serif'],
+                display: ['Orbitron', 'sans-serif'],
+            },
+            animation: {
+                'pulse-fast': 'pulse 1.5s cubic-bezier(0.4, 0, 0.6, 1) infinite',
+            }
+        }
+    }
+}
@@ -1,28 +1,95 @@
 # app/utils.py
-import shutil
+import hashlib
 import os
-from fastapi import UploadFile
+import anyio
+from fastapi import HTTPException, UploadFile
 from uuid import uuid4
+from app.core.config import settings
+from app.core.thumbnails import queue_thumbnails
 
-# Define where to save images
+# Define where to save images (created at startup, see app/main.py)
 UPLOAD_DIR = "app/static/uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+UPLOAD_URL = "/static/uploads"
+
+CHUNK_SIZE = 64 * 1024
+
+# Image types we accept, recognised by their first bytes (never by the
+# client's filename or Content-Type), and the extension they are stored under
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+def sniff_image_type(head: bytes) -> str:
+    """Returns the file extension for an accepted image, or "" if it is not one."""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return ""
+
+async def _remove(path: str):
+    try:
+        await anyio.Path(path).unlink()
+    except FileNotFoundError:
+        pass
 
 async def save_upload_file(upload_file: UploadFile) -> str:
     """
-    Saves an uploaded file to disk and returns the URL path.
+    Streams an uploaded image to disk in chunks (file I/O off the event loop)
+    and returns its URL path.
+
+    Files are content-addressed: the name is the SHA-256 of the bytes,
+    computed while streaming, so an image uploaded twice is stored once.
+    Raises 413 over MAX_UPLOAD_BYTES and 415 for anything but JPEG, PNG,
+    GIF or WebP.
     """
-    if not upload_file.filename:
+    if not upload_file or not upload_file.filename:
         return ""
-    
-    # Generate a unique filename to prevent overwrites (e.g., "my-pic.jpg" -> "uuid-my-pic.jpg")
-    file_extension = os.path.splitext(upload_file.filename)[1]
-    unique_filename = f"{uuid4()}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-    
-    # Write the file to disk
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(upload_file.file, buffer)
-        
+
+    # Starlette already knows the size of the spooled upload; fail before copying
+    if upload_file.size is not None and upload_file.size > settings.MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    digest = hashlib.sha256()
+    size = 0
+    extension = ""
+    # Written under a temporary name, renamed once the hash is known
+    temp_path = os.path.join(UPLOAD_DIR, f".{uuid4().hex}.part")
+
+    try:
+        async with await anyio.open_file(temp_path, "wb") as buffer:
+            while chunk := await upload_file.read(CHUNK_SIZE):
+                if not size:
+                    extension = sniff_image_type(chunk)
+                    if not extension:
+                        raise HTTPException(status_code=415, detail="Only JPEG, PNG, GIF and WebP images are allowed")
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="File too large")
+                digest.update(chunk)
+                await buffer.write(chunk)
+
+        if not size:
+            raise HTTPException(status_code=400, detail="Empty file")
+
+        filename = f"{digest.hexdigest()}{extension}"
+        final_path = anyio.Path(UPLOAD_DIR, filename)
+        if await final_path.exists():
+            # Same bytes already stored: keep the existing copy
+            await _remove(temp_path)
+        else:
+            await anyio.Path(temp_path).replace(final_path)
+    except BaseException:
+        await _remove(temp_path)
+        raise
+
+    # Smaller variants for the catalog cards, built in the background
+    image_url = f"{UPLOAD_URL}/{filename}"
+    queue_thumbnails(image_url)
+
     # Return the URL accessible by the browser
-    return f"/static/uploads/{unique_filename}"
\ No newline at end of file
+    return image_url
@@ -0,0 +1,95 @@
+# benchmarks/checkout.py
+"""
+Place-order latency and SQL statement count as the cart grows.
+
+    python benchmarks/checkout.py --sizes 1 10 50 200 --rounds 20
+
+Each round fills the buyer's cart with N distinct products (directly in the
+DB) and times POST /orders/place-order. A constant statement count across
+cart sizes means the route has no per-item queries.
+"""
+import argparse
+import json
+import time
+
+from common import use_sqlite, summarize
+
+use_sqlite()
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.database import Base, engine, SessionLocal
+from app.auth.models import User
+from app.cart.models import Cart, CartItem
+from app.products.models import Category, Product
+from app.core.security import get_password_hash
+
+PASSWORD = "checkout-pass"
+
+statements = 0
+
+@event.listens_for(engine, "before_cursor_execute")
+def count_statement(*args):
+    global statements
+    statements += 1
+
+
+def seed(products: int) -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    category = Category(name="Merch")
+    db.add(category)
+    db.flush()
+    user = User(username="buyer", email="buyer@example.com",
+                password_hash=get_password_hash(PASSWORD), role="buyer")
+    db.add(user)
+    db.add_all(Product(title=f"Figure {i}", description="bench", price=25.0, stock=1_000_000,
+                       category_id=category.id) for i in range(products))
+    db.flush()
+    db.add(Cart(user_id=user.id))
+    db.commit()
+    user_id = user.id
+    db.close()
+    return user_id
+
+
+def fill_cart(user_id: int, size: int):
+    db = SessionLocal()
+    cart = db.query(Cart).filter(Cart.user_id == user_id).one()
+    db.add_all(CartItem(cart_id=cart.id, product_id=product_id, quantity=2)
+               for product_id in range(1, size + 1))
+    db.commit()
+    db.close()
+
+
+def main(args):
+    global statements
+    user_id = seed(max(args.sizes))
+    client = TestClient(app)
+    response = client.post("/auth/login", data={"email": "buyer@example.com", "password": PASSWORD},
+                           follow_redirects=False)
+    assert response.status_code == 303, response.status_code
+
+    results = []
+    for size in args.sizes:
+        samples, counts = [], []
+        for _ in range(args.rounds):
+            fill_cart(user_id, size)
+            statements = 0
+            start = time.perf_counter()
+            response = client.post("/orders/place-order", follow_redirects=False)
+            samples.append(time.perf_counter() - start)
+            counts.append(statements)
+            assert response.headers["location"] == "/orders/success", response.headers.get("location")
+        results.append({"cart_size": size, "statements": max(counts), **summarize(samples)})
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    main(args)
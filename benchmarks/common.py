@@ -0,0 +1,43 @@
+# benchmarks/common.py
+"""
+Shared helpers for the scripts in this folder.
+
+Every benchmark runs the real app in-process against a throwaway SQLite
+database, so call use_sqlite() BEFORE importing anything from `app`
+(settings are read at import time).
+"""
+import os
+import statistics
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def use_sqlite(path: str = None) -> str:
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="animerch-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    # The app resolves templates/ and app/static relative to the repo root
+    os.chdir(ROOT)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    return path
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(samples) -> dict:
+    """Latency summary in milliseconds."""
+    ms = [s * 1000 for s in samples]
+    return {
+        "count": len(ms),
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "max_ms": round(max(ms), 2) if ms else 0.0,
+        "mean_ms": round(statistics.fmean(ms), 2) if ms else 0.0,
+    }
@@ -0,0 +1,107 @@
+# benchmarks/flash_sale.py
+"""
+Flash sale: many buyers check out the same hot product at once.
+
+    python benchmarks/flash_sale.py --buyers 300 --stock 50 --quantity 1
+
+Every buyer has the product in their cart before the sale opens, then all
+of them POST /orders/place-order together. Reports throughput, how many
+orders were accepted or turned away, and exits non-zero if more units were
+sold than were in stock.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from common import use_sqlite
+
+use_sqlite()
+
+import httpx
+from sqlalchemy import func
+from app.main import app
+from app.database import Base, engine, SessionLocal
+from app.auth.models import User
+from app.cart.models import Cart, CartItem
+from app.orders.models import Order, OrderItem
+from app.products.models import Category, Product
+from app.core.security import create_access_token
+
+
+def seed(buyers: int, stock: int, quantity: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    category = Category(name="Merch")
+    db.add(category)
+    db.flush()
+    product = Product(title="Limited Figure", description="flash sale", price=99.0, stock=stock,
+                      category_id=category.id)
+    db.add(product)
+    # Password hashes are never checked: buyers get their tokens minted directly
+    users = [User(username=f"buyer{i}", email=f"buyer{i}@example.com", password_hash="-", role="buyer")
+             for i in range(buyers)]
+    db.add_all(users)
+    db.flush()
+    carts = [Cart(user_id=user.id) for user in users]
+    db.add_all(carts)
+    db.flush()
+    db.add_all(CartItem(cart_id=cart.id, product_id=product.id, quantity=quantity) for cart in carts)
+    db.commit()
+    tokens = [create_access_token({"sub": user.email, "uid": user.id}) for user in users]
+    product_id = product.id
+    db.close()
+    return product_id, tokens
+
+
+async def checkout(transport, token):
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                 cookies={"access_token": f"Bearer {token}"}) as client:
+        response = await client.post("/orders/place-order")
+        return response.headers.get("location", str(response.status_code))
+
+
+async def main(args):
+    product_id, tokens = seed(args.buyers, args.stock, args.quantity)
+    transport = httpx.ASGITransport(app=app)
+
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(checkout(transport, token) for token in tokens))
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    final_stock = db.query(Product.stock).filter(Product.id == product_id).scalar()
+    units_sold = db.query(func.coalesce(func.sum(OrderItem.quantity), 0))\
+        .filter(OrderItem.product_id == product_id).scalar()
+    orders = db.query(func.count(Order.id)).scalar()
+    db.close()
+
+    accepted = sum(1 for o in outcomes if o == "/orders/success")
+    rejected = sum(1 for o in outcomes if o.startswith("/cart?error=out_of_stock"))
+    oversold = units_sold > args.stock or final_stock < 0 or final_stock + units_sold != args.stock
+
+    print(json.dumps({
+        "buyers": args.buyers,
+        "initial_stock": args.stock,
+        "quantity_per_order": args.quantity,
+        "accepted": accepted,
+        "rejected_out_of_stock": rejected,
+        "other": len(outcomes) - accepted - rejected,
+        "orders_written": orders,
+        "units_sold": units_sold,
+        "final_stock": final_stock,
+        "oversold": oversold,
+        "seconds": round(elapsed, 3),
+        "checkouts_per_second": round(len(outcomes) / elapsed, 1),
+    }, indent=2))
+    return 1 if oversold or orders != accepted else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=300)
+    parser.add_argument("--stock", type=int, default=50)
+    parser.add_argument("--quantity", type=int, default=1, help="units each buyer tries to buy")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args)))
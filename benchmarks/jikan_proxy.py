@@ -0,0 +1,100 @@
+# benchmarks/jikan_proxy.py
+"""
+The /manga/api Jikan proxy against a local stub server instead of Jikan.
+
+    python benchmarks/jikan_proxy.py --concurrency 50 --delay 0.3
+
+The stub answers after --delay seconds and counts the calls it gets. The
+script sends bursts of identical requests. It reports latency and the number
+of upstream calls for each phase:
+
+- cold: an empty cache. Coalescing should make this 1 upstream call.
+- warm: a fresh cache. This should make 0 calls.
+- stale: after the TTL has passed. Visitors get the stale copy right away
+  and 1 background refresh is made.
+- distinct: a burst of different searches, held to the token bucket rate.
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common import use_sqlite, summarize
+
+
+class StubJikan(BaseHTTPRequestHandler):
+    delay = 0.0
+    calls = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with StubJikan.lock:
+            StubJikan.calls += 1
+        time.sleep(self.delay)
+        body = json.dumps({"data": [{"title": f"Stub for {self.path}", "score": 9.0}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(delay: float) -> str:
+    StubJikan.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubJikan)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+async def burst(client, urls):
+    async def one(url):
+        start = time.perf_counter()
+        response = await client.get(url)
+        return time.perf_counter() - start, response.status_code, response.headers.get("x-cache")
+    return await asyncio.gather(*(one(url) for url in urls))
+
+
+async def run(args):
+    import httpx
+    from app.main import app
+    from app.manga.jikan import jikan
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def phase(name, urls):
+            before = StubJikan.calls
+            outcomes = await burst(client, urls)
+            # Let background refreshes land before counting
+            await asyncio.sleep(args.delay + 0.1)
+            statuses = sorted({status for _, status, _ in outcomes})
+            caches = {label: sum(1 for *_, c in outcomes if c == label) for label in ("MISS", "HIT", "STALE")}
+            results.append({"phase": name, "requests": len(urls), "upstream_calls": StubJikan.calls - before,
+                            "statuses": statuses, **caches, **summarize([t for t, *_ in outcomes])})
+
+        same = ["/manga/api/top?limit=20"] * args.concurrency
+        await phase("cold", same)
+        await phase("warm", same)
+        jikan.ttl = 0  # everything cached is now stale
+        await phase("stale", same)
+        await phase("distinct", [f"/manga/api/search?q=title{i}" for i in range(args.distinct)])
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--distinct", type=int, default=6)
+    parser.add_argument("--delay", type=float, default=0.3, help="stub response time in seconds")
+    args = parser.parse_args()
+
+    use_sqlite()
+    os.environ["JIKAN_BASE_URL"] = start_stub(args.delay)
+    asyncio.run(run(args))
@@ -0,0 +1,107 @@
+# benchmarks/login_storm.py
+"""
+Catalog latency while a burst of logins is hashing passwords.
+
+    python benchmarks/login_storm.py --logins 40 --catalog 200
+    python benchmarks/login_storm.py --inline-hash   # old behaviour, for comparison
+
+--inline-hash runs bcrypt directly on the event loop, like the routes did
+before hashing moved to its own pool.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from common import use_sqlite, summarize
+
+use_sqlite()
+
+import httpx
+from app.main import app
+from app.database import Base, engine, SessionLocal
+from app.auth.models import User
+from app.products.models import Category, Product
+from app.core import security
+from app.auth import routes as auth_routes
+
+PASSWORD = "storm-pass"
+
+
+def seed(products: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    category = Category(name="Manga")
+    db.add(category)
+    db.flush()
+    db.add(User(username="storm", email="storm@example.com",
+                password_hash=security.get_password_hash(PASSWORD), role="buyer"))
+    db.add_all(Product(title=f"Volume {i}", description="bench", price=100.0, stock=10,
+                       category_id=category.id) for i in range(products))
+    db.commit()
+    db.close()
+
+
+async def timed_get(client, url, samples):
+    start = time.perf_counter()
+    response = await client.get(url)
+    samples.append(time.perf_counter() - start)
+    response.raise_for_status()
+
+
+async def login(client):
+    response = await client.post("/auth/login", data={"email": "storm@example.com", "password": PASSWORD})
+    assert response.status_code == 303, response.status_code
+
+
+async def catalog_load(client, requests, concurrency):
+    samples = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            await timed_get(client, "/", samples)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return samples
+
+
+async def main(args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/")  # warm up templates and the pool
+
+        idle = await catalog_load(client, args.catalog, args.concurrency)
+
+        storm = [asyncio.create_task(login(client)) for _ in range(args.logins)]
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        busy = await catalog_load(client, args.catalog, args.concurrency)
+        await asyncio.gather(*storm)
+        storm_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        "hash_mode": "inline" if args.inline_hash else security.settings.PASSWORD_HASH_EXECUTOR,
+        "logins": args.logins,
+        "storm_seconds": round(storm_seconds, 2),
+        "catalog_idle": summarize(idle),
+        "catalog_during_storm": summarize(busy),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--catalog", type=int, default=200, help="catalog requests per phase")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--inline-hash", action="store_true")
+    args = parser.parse_args()
+
+    if args.inline_hash:
+        async def inline_verify(plain, hashed):
+            return security.verify_password(plain, hashed)
+        auth_routes.verify_password_async = inline_verify
+
+    seed(args.products)
+    asyncio.run(main(args))
@@ -0,0 +1,95 @@
+# benchmarks/page_weight.py
+"""
+Bytes on the wire for the home page as the catalog grows.
+
+    python benchmarks/page_weight.py --sizes 1000 10000 100000
+
+For each catalog size, GET / is fetched with Accept-Encoding identity, gzip
+and br (br only if the brotli package is installed), with template
+whitespace stripping off and on. Also reports the render time. The page
+cache is cleared before every request so each fetch is a real render.
+"""
+import argparse
+import json
+import time
+
+from common import use_sqlite, summarize
+
+use_sqlite()
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from app.main import app
+from app.core.templating import templates
+from app.database import Base, engine, SessionLocal
+from app.core.compression import brotli
+from app.core.page_cache import page_cache
+from app.products.models import Category, Product
+
+ENCODINGS = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+
+
+def seed_to(total: int, current: int, category_id: int) -> int:
+    """Bulk-inserts products until there are `total` of them."""
+    db = SessionLocal()
+    for start in range(current, total, 5000):
+        db.execute(insert(Product), [
+            {"title": f"Limited Figure {i}", "description": "A very detailed collectible figure. " * 4,
+             "price": 19.99 + i % 50, "stock": 10, "category_id": category_id,
+             "image_url": f"/static/uploads/{i:064x}.jpg"}
+            for i in range(start, min(total, start + 5000))
+        ])
+    db.commit()
+    db.close()
+    return total
+
+
+def wire_bytes(client: TestClient, encoding: str) -> int:
+    page_cache.clear()
+    with client.stream("GET", "/", headers={"Accept-Encoding": encoding}) as response:
+        assert response.status_code == 200, response.status_code
+        sent = response.headers.get("content-encoding", "identity")
+        assert sent == encoding, (encoding, sent)
+        return sum(len(chunk) for chunk in response.iter_raw())
+
+
+def main(args):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    category = Category(name="Merch")
+    db.add(category)
+    db.commit()
+    category_id = category.id
+    db.close()
+
+    client = TestClient(app)
+    # Stripping is toggled below; on-disk bytecode only knows the configured setting
+    templates.env.bytecode_cache = None
+    results, current = [], 0
+    for size in sorted(args.sizes):
+        current = seed_to(size, current, category_id)
+        for strip in (False, True):
+            templates.env.strip_whitespace = strip
+            templates.env.cache.clear()
+            row = {"products": size, "strip_whitespace": strip}
+            for encoding in ENCODINGS:
+                row[f"{encoding}_bytes"] = wire_bytes(client, encoding)
+
+            samples = []
+            for _ in range(args.rounds):
+                page_cache.clear()
+                start = time.perf_counter()
+                client.get("/", headers={"Accept-Encoding": ENCODINGS[-1]})
+                samples.append(time.perf_counter() - start)
+            row.update(summarize(samples))
+            results.append(row)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,101 @@
+# benchmarks/startup.py
+"""
+How long a fresh worker takes to serve its first request: import app.main,
+run the lifespan startup, then answer GET /. Then a few other pages are
+fetched once each (cold_pages: their first render, templates compiled on the
+spot), and the worker's peak memory is recorded.
+
+    python benchmarks/startup.py --products 100000 --runs 5
+
+Every run is a new Python process (cold imports, empty pools), timed by the
+parent from spawn to the first response. The database is generated once with
+seed_synthetic.py, then each startup mode is measured:
+
+- create: DB_SCHEMA_ON_STARTUP=create, the dev default (create_all).
+- check: the schema is inspected and the worker refuses to start if it is stale.
+- off: the schema is trusted (`python -m app.core.schema` ran at deploy time).
+- off+background: also SEARCH_INDEX_IN_BACKGROUND, so the index loads after
+  the worker is ready.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from common import ROOT, use_sqlite, summarize
+
+MODES = {
+    "create": {"DB_SCHEMA_ON_STARTUP": "create"},
+    "check": {"DB_SCHEMA_ON_STARTUP": "check"},
+    "off": {"DB_SCHEMA_ON_STARTUP": "off"},
+    "off+background": {"DB_SCHEMA_ON_STARTUP": "off", "SEARCH_INDEX_IN_BACKGROUND": "true"},
+}
+
+# Runs in the child: prints its phase timings (seconds since it started) as JSON
+CHILD = """
+import time
+started = time.perf_counter()
+import asyncio, json, os, resource, sys
+sys.path.insert(0, os.getcwd())
+import httpx
+from app.main import app
+imported = time.perf_counter()
+
+async def first_requests():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            response = await client.get("/")
+            assert response.status_code == 200, response.status_code
+            served = time.perf_counter()
+            for path in COLD_PAGES:
+                response = await client.get(path)
+                assert response.status_code == 200, (path, response.status_code)
+        return ready, served, time.perf_counter()
+
+ready, served, pages = asyncio.run(first_requests())
+print(json.dumps({"import": imported - started, "lifespan": ready - imported, "first_request": served - ready,
+                  "cold_pages": pages - served, "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+# Each rendered for the first time after GET /, so their templates are compiled cold
+COLD_PAGES = ["/merch/", "/manga/", "/manga/physical", "/auth/login", "/auth/register", "/products/1"]
+
+
+def run_once(env) -> dict:
+    spawned = time.perf_counter()
+    child = f"COLD_PAGES = {COLD_PAGES!r}\n{CHILD}"
+    result = subprocess.run([sys.executable, "-c", child], cwd=ROOT, env=env, capture_output=True, text=True)
+    total = time.perf_counter() - spawned
+    if result.returncode != 0:
+        raise SystemExit(result.stderr)
+    return {**json.loads(result.stdout.strip().splitlines()[-1]), "spawn_to_first_response": total}
+
+
+def main(args):
+    use_sqlite()
+    from seed_synthetic import generate
+
+    generate(products=args.products, users=max(100, args.products // 10), orders=args.products,
+             reset=True)
+
+    report = []
+    for mode in args.modes:
+        env = {**os.environ, **MODES[mode], "METRICS_ENABLED": "false"}
+        runs = [run_once(env) for _ in range(args.runs)]
+        phases = {phase: summarize([run[phase] for run in runs])
+                  for phase in ("import", "lifespan", "first_request", "cold_pages", "spawn_to_first_response")}
+        report.append({"mode": mode, "products": args.products, "runs": args.runs,
+                       **{phase: {"p50_ms": s["p50_ms"], "max_ms": s["max_ms"]} for phase, s in phases.items()},
+                       "max_rss_mb": round(max(run["max_rss_mb"] for run in runs), 1)})
+        print(f"  {mode:<16} ready in {phases['spawn_to_first_response']['p50_ms']:>8} ms (p50)", file=sys.stderr)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    main(parser.parse_args())
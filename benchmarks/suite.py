@@ -0,0 +1,269 @@
+# benchmarks/suite.py
+"""
+Route-level load test: throughput, p50/p95/p99 latency and SQL queries per
+request for the main user journeys, at several catalog sizes.
+
+    python benchmarks/suite.py --sizes 1000 10000 --requests 200 --concurrency 8 \\
+        --output benchmarks/results/$(git rev-parse --short HEAD).json
+    python benchmarks/suite.py --compare before.json after.json
+
+For each size (number of products), the database is regenerated with
+seed_synthetic.py (same --seed, same data), with users and orders scaled
+to match. The scenarios run against the real app in process, through
+httpx's ASGI transport, with its lifespan startup and shutdown run as in a
+real worker. Anonymous pages go through the page cache like in production
+(--cold clears it before every request). Set DATABASE_URL to run against
+MySQL instead of a throwaway SQLite file.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from common import ROOT, use_sqlite, summarize, percentile
+
+SCENARIOS = ["anon_home", "anon_merch", "anon_manga_physical", "login", "add_to_cart",
+             "checkout", "my_orders", "seller_profile"]
+
+# Statements issued while serving the current request (a list, so the
+# threadpool's copy of the context still counts into the same one)
+_statements = contextvars.ContextVar("statements", default=None)
+
+
+def install_query_counter(engine):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(*args):
+        counter = _statements.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+class VirtualUser:
+    def __init__(self, client, user_id: int):
+        self.client = client
+        self.user_id = user_id
+
+
+async def timed(samples, queries, statuses, request):
+    counter = [0]
+    token = _statements.set(counter)
+    start = time.perf_counter()
+    try:
+        response = await request()
+    finally:
+        samples.append(time.perf_counter() - start)
+        _statements.reset(token)
+    queries.append(counter[0])
+    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    return response
+
+
+def scenario_steps(name, vu: VirtualUser, product_id: int, password: str):
+    """(setup, measured request): setup runs untimed before the measured call."""
+    client = vu.client
+    email = f"user{vu.user_id}@example.com"
+    add = lambda: client.post(f"/cart/add/{product_id}")
+    return {
+        "anon_home": (None, lambda: client.get("/")),
+        "anon_merch": (None, lambda: client.get("/merch/")),
+        "anon_manga_physical": (None, lambda: client.get("/manga/physical")),
+        "login": (None, lambda: client.post("/auth/login", data={"email": email, "password": password})),
+        "add_to_cart": (None, add),
+        "checkout": (add, lambda: client.post("/orders/place-order")),
+        "my_orders": (None, lambda: client.get("/orders/my-orders")),
+        "seller_profile": (None, lambda: client.get("/profile/")),
+    }[name]
+
+
+async def run_scenario(name, users, anonymous, args, password, product_ids, page_cache):
+    samples, queries, statuses = [], [], {}
+    if name.startswith("anon_"):
+        pool = anonymous
+    else:
+        buyers, sellers = users
+        pool = sellers if name == "seller_profile" else buyers
+    # bcrypt makes logins ~100x slower than page views; keep that scenario short
+    requests = min(args.requests, args.login_requests) if name == "login" else args.requests
+    sem = asyncio.Semaphore(args.concurrency)
+    # One virtual user is never in two requests at once (cookies, carts)
+    locks = {id(vu): asyncio.Lock() for vu in pool}
+
+    async def one(i):
+        vu = pool[i % len(pool)]
+        setup, request = scenario_steps(name, vu, product_ids[i % len(product_ids)], password)
+        async with sem, locks[id(vu)]:
+            if setup is not None:
+                await setup()
+            if args.cold and name.startswith("anon_"):
+                page_cache.clear()
+            await timed(samples, queries, statuses, request)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "scenario": name,
+        "requests": len(samples),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "errors": sum(v for k, v in statuses.items() if k >= 400),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "queries_per_request": {"mean": round(sum(queries) / max(1, len(queries)), 2), "max": max(queries, default=0),
+                                "p95": percentile(queries, 95)},
+        **summarize(samples),
+    }
+
+
+async def run_size(size, args):
+    import httpx
+    from sqlalchemy import select
+    from app.main import app
+    from app.auth.models import User, UserRole
+    from app.core.page_cache import page_cache
+    from app.database import SessionLocal
+    from app.dependencies import user_cache
+    from app.products.cache import invalidate_catalog_caches
+    from app.products.models import Product
+    from seed_synthetic import generate, PASSWORD
+
+    print(f"== {size:,} products ==", file=sys.stderr)
+    generate(seed=args.seed, users=max(args.virtual_users * 4, size // 10), products=size, orders=size * 2,
+             workers=args.workers, reset=True)
+    invalidate_catalog_caches()
+    user_cache.clear()
+
+    db = SessionLocal()
+    try:
+        buyers = db.scalars(select(User.id).where(User.role == UserRole.BUYER).order_by(User.id)
+                            .limit(args.virtual_users)).all()
+        sellers = db.scalars(select(User.id).where(User.role == UserRole.SELLER).order_by(User.id)
+                             .limit(max(1, args.virtual_users // 4))).all()
+        # Products that can actually be bought many times over
+        product_ids = db.scalars(select(Product.id).where(Product.stock >= 100).order_by(Product.id)
+                                 .limit(200)).all()
+    finally:
+        db.close()
+
+    # Run the app's startup like a real worker: schema step, search index, static
+    # manifest, cart flush and metrics threads (ASGITransport alone skips it)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        clients = []
+
+        def new_client():
+            client = httpx.AsyncClient(transport=transport, base_url="http://bench", follow_redirects=False)
+            clients.append(client)
+            return client
+
+        try:
+            anonymous = [VirtualUser(new_client(), 0) for _ in range(args.concurrency)]
+            users = ([VirtualUser(new_client(), user_id) for user_id in buyers],
+                     [VirtualUser(new_client(), user_id) for user_id in sellers])
+            # Warm up templates and the pool, then log everyone in (login is measured separately)
+            await anonymous[0].client.get("/")
+            for vu in users[0] + users[1]:
+                response = await vu.client.post("/auth/login", data={"email": f"user{vu.user_id}@example.com",
+                                                                     "password": PASSWORD})
+                assert response.status_code == 303, response.status_code
+
+            results = []
+            for name in args.scenarios:
+                result = await run_scenario(name, users, anonymous, args, PASSWORD, product_ids, page_cache)
+                results.append({"products": size, **result})
+                print(f"  {name:<20} {result['throughput_rps']:>8} req/s  p95 {result['p95_ms']:>8} ms  "
+                      f"{result['queries_per_request']['mean']:>6} queries  {result['errors']} errors", file=sys.stderr)
+            return results
+        finally:
+            for client in clients:
+                await client.aclose()
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(before_path, after_path, threshold):
+    """Prints p95 and query-count changes per (size, scenario). Returns 1 if anything regressed."""
+    with open(before_path) as f:
+        before = {(r["products"], r["scenario"]): r for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+    regressed = False
+    for row in after:
+        old = before.get((row["products"], row["scenario"]))
+        if old is None:
+            continue
+        change = (row["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        queries = row["queries_per_request"]["mean"] - old["queries_per_request"]["mean"]
+        flag = change > threshold or queries > 0
+        regressed |= flag
+        print(f"{row['products']:>9,} {row['scenario']:<20} p95 {old['p95_ms']:>8} -> {row['p95_ms']:>8} ms "
+              f"({change:+6.1f}%)  queries {queries:+.2f}{'  <-- regression' if flag else ''}")
+    return 1 if regressed else 0
+
+
+def main(args):
+    if args.compare:
+        return compare(*args.compare, threshold=args.threshold)
+
+    if "DATABASE_URL" not in os.environ:
+        use_sqlite()
+    else:
+        os.chdir(ROOT)
+        sys.path.insert(0, ROOT)
+    from app.database import engine
+    install_query_counter(engine)
+
+    started = datetime.now(timezone.utc)
+    results = []
+    for size in args.sizes:
+        results.extend(asyncio.run(run_size(size, args)))
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "started_at": started.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=200, help="per scenario")
+    parser.add_argument("--login-requests", type=int, default=40, help="cap for the login scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--virtual-users", type=int, default=16, help="logged-in buyers (sellers: a quarter)")
+    parser.add_argument("--cold", action="store_true", help="bypass the page cache for anonymous pages")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="data generator processes")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two reports and exit")
+    parser.add_argument("--threshold", type=float, default=10.0, help="p95 increase (%%) reported as a regression")
+    sys.exit(main(parser.parse_args()))
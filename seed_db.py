@@ -4,11 +4,13 @@ import os
 # Ensure we can import from 'app'
 sys.path.append(os.getcwd())
 
-import requests
+import argparse
 import random
+import time
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import OperationalError, ProgrammingError, IntegrityError
 from app.database import SessionLocal, engine, Base
+from app.manga.jikan import jikan, JikanError
 
 # --- CRITICAL: Import ALL models so SQLAlchemy knows how to drop them in order ---
 from app.auth.models import User
@@ -25,8 +27,8 @@ AUTO_FIX_SCHEMA = True
 def get_manga():
     print("📡 Fetching Manga from Jikan API...")
     try:
-        res = requests.get('https://api.jikan.moe/v4/top/manga?filter=bypopularity&limit=5')
-        data = res.json().get('data', [])
+        # Rate limited, with a timeout (JIKAN_TIMEOUT_SECONDS)
+        data = jikan.fetch_json("top/manga", {"filter": "bypopularity", "limit": 5}).get('data', [])
         return [{
             "title": i['title'],
             "description": i['synopsis'][:200] + "..." if i['synopsis'] else "No text.",
@@ -34,7 +36,8 @@ def get_manga():
             "image_url": i['images']['jpg']['large_image_url'],
             "stock": random.randint(5, 50)
         } for i in data]
-    except:
+    except (JikanError, ValueError, KeyError, TypeError) as e:
+        print(f"⚠️  Skipping manga: {e}")
         return []
 
 def get_merch():
@@ -110,5 +113,37 @@ def seed(reset=False):
     finally:
         db.close()
 
+def main():
+    parser = argparse.ArgumentParser(description="Seed the database with demo data.")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate every table first")
+    synthetic = parser.add_argument_group("synthetic data (offline, for load testing; see seed_synthetic.py)")
+    synthetic.add_argument("--synthetic", action="store_true", help="generate a large dataset instead of the demo rows")
+    synthetic.add_argument("--seed", type=int, default=42, help="same seed, same data")
+    synthetic.add_argument("--users", type=int, default=10_000)
+    synthetic.add_argument("--seller-pct", type=int, default=5, help="share of users who sell")
+    synthetic.add_argument("--products", type=int, default=100_000)
+    synthetic.add_argument("--orders", type=int, default=200_000)
+    synthetic.add_argument("--cart-pct", type=int, default=20, help="share of buyers with a non-empty cart")
+    synthetic.add_argument("--days", type=int, default=365, help="spread created_at over this many days")
+    synthetic.add_argument("--batch-size", type=int, default=5_000, help="rows per INSERT executemany")
+    synthetic.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if not args.synthetic:
+        seed(reset=args.reset)
+        return
+    if min(args.users, args.products) < 1 or args.users * args.seller_pct // 100 >= args.users:
+        parser.error("need at least one product and one buyer")
+
+    # Imported here: it pulls in the whole app (order summaries, rollups)
+    from seed_synthetic import generate, PASSWORD
+    started = time.perf_counter()
+    print(f"🌱 Generating synthetic data (seed {args.seed})...")
+    counts = generate(seed=args.seed, users=args.users, seller_pct=args.seller_pct, products=args.products,
+                      orders=args.orders, cart_pct=args.cart_pct, days=args.days, batch_size=args.batch_size,
+                      workers=args.workers, reset=args.reset)
+    print(f"✅ DONE! {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s. "
+          f"Log in as user<N>@example.com / {PASSWORD}")
+
 if __name__ == "__main__":
-    seed()
\ No newline at end of file
+    main()
\ No newline at end of file
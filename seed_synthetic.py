@@ -0,0 +1,258 @@
+# seed_synthetic.py
+"""
+Offline, reproducible load-test data: users, categories, products, carts,
+orders and order items, up to millions of rows.
+
+    python seed_db.py --synthetic --products 1000000 --orders 2000000 --workers 4 --reset
+
+Rows are generated in fixed-size chunks, each with its own RNG seeded from
+(--seed, table, chunk), so the same seed gives the same data whatever the
+number of workers. Every chunk is one transaction of batched Core
+executemany inserts, and chunks run in a process pool. SQLite allows one
+writer at a time, so it always uses a single worker.
+
+Product popularity (what gets ordered and carted) and seller size follow a
+power law: a few items sell a lot, most rarely sell. Every user's password
+is PASSWORD, so load tests can log in as user<N>@example.com.
+"""
+import math
+import multiprocessing
+import random
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Tuple
+from sqlalchemy import func, insert, select, text
+from app.database import Base, engine, SessionLocal
+
+# Register every table (and the relationships between them)
+from app.auth.models import User, UserRole
+from app.products.models import Category, Product
+from app.cart.models import Cart, CartItem
+from app.orders.models import Order, OrderItem
+from app.orders.queries import order_summary
+from app.profile import models as profile_models  # noqa: F401
+from app.profile.rollups import rebuild
+
+PASSWORD = "synthetic-pass"
+CHUNK_ROWS = 10_000
+ZIPF_EXPONENT = 1.1
+# Multiplier for a bijection on 1..n that spreads popular ranks over the ids
+_SCRAMBLE = 2_147_483_647
+
+CATEGORIES = [("Merchandise", 30), ("Manga", 25), ("Figures", 15), ("Apparel", 10),
+              ("Accessories", 8), ("Posters", 6), ("Plushies", 4), ("Keychains", 2)]
+SERIES = ["Naruto", "One Piece", "Bleach", "Jujutsu Kaisen", "Demon Slayer", "Attack on Titan",
+          "Chainsaw Man", "Spy x Family", "Dragon Ball", "Frieren", "Evangelion", "Haikyuu"]
+ITEMS = ["Figure", "Vol. 1", "Box Set", "Hoodie", "T-Shirt", "Poster", "Keychain", "Plush",
+         "Art Book", "Mug", "Acrylic Stand", "Cosplay Set"]
+EDITIONS = ["", "Limited ", "Deluxe ", "Collector's ", "Signed ", "Vintage "]
+STATUSES = [("Pending", 10), ("Paid", 30), ("Shipped", 60)]
+
+
+class Config(NamedTuple):
+    seed: int
+    users: int
+    sellers: int
+    products: int
+    orders: int
+    cart_pct: int
+    days: int
+    batch_size: int
+    password_hash: str
+    now: datetime
+
+
+# --- Deterministic helpers (the same answer in every process) ---
+def _hash(config: Config, kind: str, key: int) -> int:
+    return zlib.crc32(f"{config.seed}:{kind}:{key}".encode())
+
+def product_title(config: Config, product_id: int) -> str:
+    h = _hash(config, "title", product_id)
+    edition = EDITIONS[h % len(EDITIONS)]
+    series = SERIES[(h >> 8) % len(SERIES)]
+    item = ITEMS[(h >> 16) % len(ITEMS)]
+    return f"{edition}{series} {item} #{product_id}"
+
+def product_price(config: Config, product_id: int) -> float:
+    # Log-uniform between ~7 and ~400: many cheap items, a few expensive ones
+    h = _hash(config, "price", product_id)
+    return round(math.exp(2 + 4 * (h % 10_000) / 10_000), 2)
+
+def zipf_rank(rng: random.Random, n: int) -> int:
+    """1..n, rank 1 the most likely (inverse CDF of a bounded power law)."""
+    a = 1 - ZIPF_EXPONENT
+    return min(n, int((((n + 1) ** a - 1) * rng.random() + 1) ** (1 / a)))
+
+def popular_id(rng: random.Random, n: int) -> int:
+    """A power-law pick from ids 1..n, with the popular ones scattered rather than all at the low ids."""
+    return (zipf_rank(rng, n) - 1) * _SCRAMBLE % n + 1
+
+def _weighted(rng: random.Random, choices) -> str:
+    return rng.choices([name for name, _ in choices], weights=[weight for _, weight in choices])[0]
+
+def _timestamp(rng: random.Random, config: Config) -> datetime:
+    # Whole seconds, like SQLite's CURRENT_TIMESTAMP (keyset cursors compare them as text)
+    return (config.now - timedelta(seconds=rng.randrange(config.days * 86400))).replace(microsecond=0)
+
+def _rng(config: Config, table: str, start: int) -> random.Random:
+    return random.Random(f"{config.seed}:{table}:{start}")
+
+
+# --- Row generators: one chunk of ids [start, end) each ---
+def gen_users(config: Config, start: int, end: int):
+    for user_id in range(start, end):
+        yield User.__table__, {
+            "id": user_id,
+            "username": f"user{user_id}",
+            "email": f"user{user_id}@example.com",
+            "password_hash": config.password_hash,
+            "role": UserRole.SELLER if user_id <= config.sellers else UserRole.BUYER,
+            "avatar_url": "/static/images/default_avatar.png",
+        }
+
+def gen_products(config: Config, start: int, end: int):
+    rng = _rng(config, "products", start)
+    category_ids = {name: index for index, (name, _) in enumerate(CATEGORIES, start=1)}
+    for product_id in range(start, end):
+        yield Product.__table__, {
+            "id": product_id,
+            "seller_id": popular_id(rng, config.sellers),
+            "category_id": category_ids[_weighted(rng, CATEGORIES)],
+            "title": product_title(config, product_id),
+            "description": f"Official {product_title(config, product_id)}. Synthetic item for load testing.",
+            "price": product_price(config, product_id),
+            "image_url": None,
+            "created_at": _timestamp(rng, config),
+            "stock": rng.randint(0, 500),
+        }
+
+def gen_carts(config: Config, start: int, end: int):
+    # Cart id = owner's user id; only buyers, and only cart_pct of them
+    rng = _rng(config, "carts", start)
+    for user_id in range(start, end):
+        if user_id <= config.sellers or rng.randrange(100) >= config.cart_pct:
+            continue
+        yield Cart.__table__, {"id": user_id, "user_id": user_id}
+        for product_id in {popular_id(rng, config.products) for _ in range(rng.randint(1, 4))}:
+            yield CartItem.__table__, {"cart_id": user_id, "product_id": product_id, "quantity": rng.randint(1, 3)}
+
+def gen_orders(config: Config, start: int, end: int):
+    rng = _rng(config, "orders", start)
+    buyers = config.users - config.sellers
+    for order_id in range(start, end):
+        product_ids = list(dict.fromkeys(popular_id(rng, config.products) for _ in range(rng.choice((1, 1, 1, 2, 2, 3, 5)))))
+        lines = [(product_id, rng.randint(1, 3), product_price(config, product_id)) for product_id in product_ids]
+        yield Order.__table__, {
+            "id": order_id,
+            "user_id": config.sellers + popular_id(rng, buyers),
+            "total_price": round(sum(quantity * price for _, quantity, price in lines), 2),
+            "status": _weighted(rng, STATUSES),
+            "created_at": _timestamp(rng, config),
+            "item_count": sum(quantity for _, quantity, _ in lines),
+            "summary": order_summary([product_title(config, product_id) for product_id in product_ids]),
+        }
+        for product_id, quantity, price in lines:
+            yield OrderItem.__table__, {"order_id": order_id, "product_id": product_id,
+                                        "quantity": quantity, "price": price}
+
+PHASES = [("users", gen_users), ("products", gen_products), ("carts", gen_carts), ("orders", gen_orders)]
+GENERATORS = dict(PHASES)
+
+
+def insert_chunk(config: Config, phase: str, start: int, end: int) -> int:
+    """Generates and inserts one chunk in one transaction. Runs in a worker process."""
+    batches = {}
+    written = 0
+    with engine.begin() as conn:
+        def flush(table):
+            rows = batches.pop(table, None)
+            if rows:
+                conn.execute(insert(table), rows)
+
+        for table, row in GENERATORS[phase](config, start, end):
+            # Parents are written before children: order_items never outrun their orders
+            batch = batches.setdefault(table, [])
+            batch.append(row)
+            written += 1
+            if len(batch) >= config.batch_size:
+                for pending in list(batches):
+                    flush(pending)
+        for pending in list(batches):
+            flush(pending)
+    return written
+
+
+def _phase_size(config: Config, phase: str) -> int:
+    return {"users": config.users, "products": config.products,
+            "carts": config.users, "orders": config.orders}[phase]
+
+def _insert_chunk_job(job: Tuple[Config, str, int, int]) -> int:
+    return insert_chunk(*job)
+
+def _fix_sequences():
+    # PostgreSQL sequences don't move for explicit ids (MySQL and SQLite catch up by themselves)
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for table in ("users", "categories", "products", "carts", "orders"):
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                              f"COALESCE((SELECT MAX(id) FROM {table}), 1))"))
+
+
+def generate(seed: int = 42, users: int = 10_000, seller_pct: int = 5, products: int = 100_000,
+             orders: int = 200_000, cart_pct: int = 20, days: int = 365, batch_size: int = 5_000,
+             workers: int = 1, reset: bool = False) -> dict:
+    """Fills an empty database. Returns {table phase: rows written}."""
+    from app.core.security import get_password_hash
+
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(User.__table__)).scalar():
+            raise SystemExit("The database already has users: run with --reset (drops every table) to regenerate.")
+
+    if engine.dialect.name == "sqlite" and workers > 1:
+        print("SQLite has a single writer: using 1 worker")
+        workers = 1
+
+    sellers = max(1, users * seller_pct // 100)
+    config = Config(seed=seed, users=users, sellers=sellers, products=products, orders=orders,
+                    cart_pct=cart_pct, days=days, batch_size=batch_size,
+                    password_hash=get_password_hash(PASSWORD),
+                    now=datetime(2025, 1, 1) + timedelta(days=days))
+
+    with engine.begin() as conn:
+        conn.execute(insert(Category.__table__),
+                     [{"id": index, "name": name} for index, (name, _) in enumerate(CATEGORIES, start=1)])
+
+    counts = {"categories": len(CATEGORIES)}
+    # spawn: each worker builds its own engine (and connection pool)
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) \
+        if workers > 1 else None
+    try:
+        for phase, _ in PHASES:
+            started = time.perf_counter()
+            size = _phase_size(config, phase)
+            jobs = [(config, phase, start, min(size + 1, start + CHUNK_ROWS))
+                    for start in range(1, size + 1, CHUNK_ROWS)]
+            # Phases run in order (foreign keys); the chunks of one phase in parallel
+            results = pool.map(_insert_chunk_job, jobs) if pool else map(_insert_chunk_job, jobs)
+            counts[phase] = sum(results)
+            elapsed = time.perf_counter() - started
+            print(f"  {phase:<9} {counts[phase]:>10,} rows in {elapsed:6.1f}s "
+                  f"({counts[phase] / max(elapsed, 1e-9):,.0f} rows/s)")
+    finally:
+        if pool:
+            pool.shutdown()
+
+    _fix_sequences()
+    db = SessionLocal()
+    try:
+        sellers_with_sales = rebuild(db)
+    finally:
+        db.close()
+    print(f"  rollups   rebuilt for {sellers_with_sales:,} sellers")
+    return counts